@@ -24,7 +24,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=datas,
-    hiddenimports=['PyQt5.QtWidgets', 'pandas', 'openpyxl', 'yaml'],
+    hiddenimports=['PyQt5.QtWidgets', 'pandas', 'openpyxl', 'yaml', 'python_calamine', 'xlrd'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -1,11 +1,20 @@
 """Background task processing for Excel comparison."""
 
 from pathlib import Path
+from typing import Dict, List, Optional
 import logging
+import sqlite3
 from PyQt5.QtCore import QObject, QRunnable, pyqtSignal, pyqtSlot
 import pandas as pd
 
-from logic import ExcelProcessor
+from batch import BatchResult, compare_acts
+from export import export_discrepancies
+from history import open_history
+from instrumentation import StageRecorder, profile_run
+from logic import CancelToken, ExcelProcessor, OperationCancelled
+from matching import near_matches
+from session import ComparisonSession
+from streaming import PartitionedComparison, needs_partitioning
 
 
 class CompareSignals(QObject):
@@ -14,46 +23,88 @@ class CompareSignals(QObject):
     finished = pyqtSignal(object)  # Emits DataFrame with results
     error = pyqtSignal(str)  # Emits error message
     progress = pyqtSignal(int)  # Emits progress percentage
+    cancelled = pyqtSignal()  # Emitted when the comparison was cancelled
+    metrics = pyqtSignal(object)  # Emits stage records before finished
+    near_matches = pyqtSignal(object)  # Emits near-matched IDs before finished
 
 
 class CompareFilesTask(QRunnable):
-    """Background task for comparing Excel files."""
+    """Background task for comparing Excel files.
 
-    def __init__(self, registry_path: Path, act_path: Path):
+    Each side may consist of several files, and of several sheets per
+    workbook (see ``excel.sheets`` in config.yaml). A ``session`` shared
+    between tasks makes re-comparisons incremental. With ``profile_path``
+    set, the run is profiled and the report is written there (without
+    suffix); files are then parsed in this thread so the profile covers them.
+    ``config`` is the application configuration (read from config.yaml when
+    omitted). With ``fuzzy.enabled`` set, IDs found in one file only are
+    paired with similar IDs of the other and emitted as ``near_matches``.
+    With ``history.enabled`` set, the result is saved to the run history.
+    """
+
+    def __init__(
+        self,
+        registry_paths: List[Path],
+        act_paths: List[Path],
+        profile_path: Optional[Path] = None,
+        session: Optional[ComparisonSession] = None,
+        config: Optional[Dict] = None,
+    ):
         super().__init__()
-        self.registry_path = Path(registry_path)
-        self.act_path = Path(act_path)
+        self.registry_paths = [Path(p) for p in registry_paths]
+        self.act_paths = [Path(p) for p in act_paths]
+        self.profile_path = profile_path
+        self.session = session
         self.signals = CompareSignals()
-        self.processor = ExcelProcessor()
+        self.processor = ExcelProcessor(config)
+        self.cancel_token = CancelToken()
+        settings = self.processor.config["instrumentation"]
+        if settings["enabled"]:
+            self.processor.recorder = StageRecorder(settings["trace_allocations"])
+        if profile_path is not None:
+            config = self.processor.config
+            self.processor.config = dict(
+                config, loading=dict(config["loading"], processes=1)
+            )
+        self._fractions = [0.0, 0.0]
+        self._percent = 0
+
+    def cancel(self):
+        """Stop the comparison at its next checkpoint."""
+        self.cancel_token.cancel()
+
+    def _on_progress(self, index: int, fraction: float):
+        """Map per-side parsing progress onto the first 80% of the bar."""
+        self._fractions[index] = fraction
+        percent = int(80 * sum(self._fractions) / len(self._fractions))
+        if percent != self._percent:
+            self._percent = percent
+            self.signals.progress.emit(percent)
 
     @pyqtSlot()
     def run(self):
-        """Execute the comparison task."""
-        try:
-            # Load registry file
-            self.signals.progress.emit(10)
-            reg_df, reg_id, reg_amt = self.processor.load_excel(self.registry_path)
-
-            # Load act file
-            self.signals.progress.emit(30)
-            act_df, act_id, act_amt = self.processor.load_excel(self.act_path)
-
-            # Preprocess data
-            self.signals.progress.emit(50)
-            reg_clean = self.processor.preprocess_dataframe(reg_df, reg_id, reg_amt)
-            self.signals.progress.emit(70)
-            act_clean = self.processor.preprocess_dataframe(act_df, act_id, act_amt)
-
-            # Find discrepancies
-            self.signals.progress.emit(90)
-            result = self.processor.find_discrepancies(
-                reg_clean, act_clean, reg_id, reg_amt, act_id, act_amt
-            )
-            self.signals.progress.emit(100)
+        """Execute the comparison task, profiling it if requested."""
+        if self.profile_path is None:
+            self._run()
+        else:
+            with profile_run(self.profile_path):
+                self._run()
 
-            # Emit result
-            self.signals.finished.emit(result)
+    def _emit_result(self, result: pd.DataFrame):
+        if self.processor.recorder is not None:
+            self.signals.metrics.emit(self.processor.recorder.records)
+        self.signals.finished.emit(result)
 
+    def _run(self):
+        try:
+            result = self._compare()
+            if isinstance(result, pd.DataFrame):
+                self._find_near_matches(result)
+                self._save_to_history(result)
+            self._emit_result(result)
+        except OperationCancelled:
+            logging.info("Comparison cancelled")
+            self.signals.cancelled.emit()
         except (FileNotFoundError, pd.errors.EmptyDataError) as e:
             logging.exception("File error in comparison task")
             self.signals.error.emit(f"File error: {str(e)}")
@@ -66,3 +117,136 @@ class CompareFilesTask(QRunnable):
         except RuntimeError as e:
             logging.exception("Runtime error in comparison task")
             self.signals.error.emit(str(e))
+
+    def _find_near_matches(self, result: pd.DataFrame):
+        settings = self.processor.config["fuzzy"]
+        if settings["enabled"]:
+            with self.processor.stage("near_matches", rows=len(result)):
+                matches = near_matches(result, settings["min_confidence"])
+            self.signals.near_matches.emit(matches)
+
+    def _save_to_history(self, result: pd.DataFrame):
+        """Save the run to the history; a failure there only gets logged."""
+        history = open_history(self.processor.config)
+        if history is None:
+            return
+        try:
+            with self.processor.stage("history", rows=len(result)):
+                history.save_run(
+                    result, self.registry_paths, self.act_paths, self.processor.config
+                )
+        except (sqlite3.Error, OSError):
+            logging.exception("Failed to save the run to %s", history.path)
+
+    def _compare(self) -> pd.DataFrame:
+        """Run the comparison and return the discrepancies."""
+        paths = self.registry_paths + self.act_paths
+        if needs_partitioning(self.processor.config, paths):
+            # Too large for memory: compare partition by partition
+            result = PartitionedComparison(self.processor).compare(
+                self.registry_paths,
+                self.act_paths,
+                progress=lambda f: self.signals.progress.emit(int(100 * f)),
+                cancel=self.cancel_token,
+            )
+            if self.session is not None:
+                self.session.reset()
+            return result
+
+        if self.session is not None:
+            # Re-parse and re-compare only what changed since last time
+            result = self.session.compare(
+                self.processor,
+                self.registry_paths,
+                self.act_paths,
+                progress=self._on_progress,
+                cancel=self.cancel_token,
+            )
+            self.signals.progress.emit(100)
+            return result
+
+        # Load and preprocess all files and sheets in parallel processes
+        loaded = self.processor.load_sides(
+            [self.registry_paths, self.act_paths],
+            progress=self._on_progress,
+            cancel=self.cancel_token,
+        )
+        (reg_clean, reg_id, reg_amt), (act_clean, act_id, act_amt) = loaded
+
+        # Find discrepancies
+        self.signals.progress.emit(90)
+        result = self.processor.find_discrepancies(
+            reg_clean,
+            act_clean,
+            reg_id,
+            reg_amt,
+            act_id,
+            act_amt,
+            cancel=self.cancel_token,
+        )
+        self.signals.progress.emit(100)
+        return result
+
+
+class BatchCompareTask(CompareFilesTask):
+    """Background task comparing one registry with several acts.
+
+    Each of ``act_paths`` is a separate act. Emits a ``batch.BatchResult``.
+    """
+
+    def _compare(self) -> BatchResult:
+        """Run the batch comparison and return its result."""
+        return compare_acts(
+            self.processor,
+            self.registry_paths,
+            self.act_paths,
+            progress=lambda f: self.signals.progress.emit(int(100 * f)),
+            cancel=self.cancel_token,
+        )
+
+
+class ExportSignals(QObject):
+    """Signals for report export background task."""
+
+    finished = pyqtSignal(str)  # Emits path of the written report
+    error = pyqtSignal(str)  # Emits error message
+    progress = pyqtSignal(int)  # Emits progress percentage
+    cancelled = pyqtSignal()  # Emitted when the export was cancelled
+
+
+class ExportTask(QRunnable):
+    """Background task for writing a discrepancy report."""
+
+    def __init__(self, diffs: pd.DataFrame, path: Path):
+        super().__init__()
+        self.diffs = diffs
+        self.path = Path(path)
+        self.signals = ExportSignals()
+        self.cancel_token = CancelToken()
+
+    def cancel(self):
+        """Stop the export after the chunk being written."""
+        self.cancel_token.cancel()
+
+    @pyqtSlot()
+    def run(self):
+        """Execute the export task."""
+        try:
+            export_discrepancies(
+                self.diffs,
+                self.path,
+                progress=lambda f: self.signals.progress.emit(int(100 * f)),
+                cancel=self.cancel_token,
+            )
+            self.signals.finished.emit(str(self.path))
+        except OperationCancelled:
+            logging.info("Export to %s cancelled", self.path)
+            self.signals.cancelled.emit()
+        except PermissionError as e:
+            logging.exception("Permission denied when saving to %s", self.path)
+            self.signals.error.emit(
+                f"Access denied. Make sure you have write permissions: {str(e)}"
+            )
+        except (OSError, ValueError) as e:
+            logging.exception("Failed to save %s", self.path)
+            self.signals.error.emit(f"Failed to save file: {str(e)}")
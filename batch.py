@@ -0,0 +1,139 @@
+"""Reconcile one registry against many acts.
+
+The registry is loaded and indexed once. Acts are parsed in parallel, one
+group per round of the loader processes, and each act is matched against the
+registry index as soon as its group is loaded, so only a few acts are held in
+memory at a time. Registry amounts that no act covers are reported at the end.
+"""
+
+import logging
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from logic import (
+    MINOR_UNITS,
+    CancelToken,
+    ExcelProcessor,
+    IndexedIds,
+    discrepancy_frame,
+    worker_count,
+)
+
+# Share of the progress bar spent loading the registry
+REGISTRY_SHARE = 0.1
+
+SUMMARY_COLUMNS = [
+    "File",
+    "Rows",
+    "Matched",
+    "Discrepancies",
+    "Act total",
+    "Registry total",
+    "Diff",
+]
+
+
+class BatchResult(NamedTuple):
+    """Discrepancies of every act plus the registry rows no act covers."""
+
+    acts: Dict[str, pd.DataFrame]  # Discrepancies per act name, in input order
+    uncovered: pd.DataFrame  # Registry IDs found in none of the acts
+    summary: pd.DataFrame  # One row per act with SUMMARY_COLUMNS
+
+
+def act_names(paths: List[Path]) -> List[str]:
+    """Name acts by file name, numbering repeated names."""
+    names, seen = [], {}
+    for path in paths:
+        name = Path(path).name
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name} ({seen[name]})")
+    return names
+
+
+def compare_acts(
+    processor: ExcelProcessor,
+    registry_paths: List[Path],
+    act_paths: List[Path],
+    progress: Optional[Callable[[float], None]] = None,
+    cancel: Optional[CancelToken] = None,
+) -> BatchResult:
+    """Compare one registry with each of several acts.
+
+    Each act only reports its own IDs: amounts that differ from the registry
+    and IDs the registry lacks. Registry IDs missing from every act are
+    collected in ``uncovered`` instead of being repeated for each act.
+
+    Args:
+        processor: Processor whose settings, cache and recorder are used
+        registry_paths: Files making up the registry
+        act_paths: One file per act
+        progress: Optional callback receiving the overall fraction done
+        cancel: Optional token checked while parsing and between acts
+
+    Returns:
+        Per-act discrepancies, uncovered registry rows and a summary
+
+    Raises:
+        OperationCancelled: If ``cancel`` was triggered
+    """
+    report = (lambda _, f: progress(REGISTRY_SHARE * f)) if progress else None
+    registry = IndexedIds(processor.load_sides([registry_paths], report, cancel)[0])
+    threshold = round(processor.config["epsilon"] * MINOR_UNITS, 6)
+    covered = np.zeros(len(registry.ids), dtype=bool)
+
+    names = act_names(act_paths)
+    acts: Dict[str, pd.DataFrame] = {}
+    summary = []
+    group = worker_count(processor.config["loading"]["processes"])
+    for start in range(0, len(act_paths), group):
+        paths = act_paths[start : start + group]
+
+        def report(i: int, fraction: float, start: int = start) -> None:
+            done = (start + i + fraction) / len(act_paths)
+            progress(REGISTRY_SHARE + (1 - REGISTRY_SHARE) * done)
+
+        loaded = processor.load_sides(
+            [[path] for path in paths], report if progress else None, cancel
+        )
+        for name, entry in zip(names[start : start + group], loaded):
+            if cancel is not None:
+                cancel.check()
+            act = IndexedIds(entry)
+            with processor.stage("merge", file=name, rows=len(act.ids)):
+                pos = registry.positions(act.ids)
+                found = pos >= 0
+                covered[pos[found]] = True
+                reg_units = registry.units_at(pos)
+                hit = np.abs(reg_units - act.units) > threshold
+                acts[name] = discrepancy_frame(
+                    act.ids[hit], reg_units[hit], act.units[hit]
+                )
+            summary.append(
+                [
+                    name,
+                    len(act.ids),
+                    int(found.sum()),
+                    int(hit.sum()),
+                    act.units.sum() / MINOR_UNITS,
+                    reg_units.sum() / MINOR_UNITS,
+                    (reg_units.sum() - act.units.sum()) / MINOR_UNITS,
+                ]
+            )
+
+    left = ~covered & (np.abs(registry.units) > threshold)
+    uncovered = discrepancy_frame(
+        registry.ids[left],
+        registry.units[left],
+        np.zeros(int(left.sum()), dtype=np.int64),
+    )
+    logging.info(
+        "Compared %s acts: %s discrepancies, %s registry IDs in no act",
+        len(acts),
+        sum(len(frame) for frame in acts.values()),
+        len(uncovered),
+    )
+    return BatchResult(acts, uncovered, pd.DataFrame(summary, columns=SUMMARY_COLUMNS))
@@ -0,0 +1,427 @@
+"""Benchmarks for the comparison pipeline on synthetic registry/act pairs.
+
+Usage examples::
+
+    python -m bench --rows 10000 100000
+    python -m bench --rows 1000000 --format csv --repeat 1 --no-memory
+    python -m bench --rows 100000 --engines calamine openpyxl
+    python -m bench --save-baseline bench_baseline.json
+    python -m bench --baseline bench_baseline.json --tolerance 0.25
+
+Each case generates (or reuses from ``--data-dir``) a registry and an act,
+then times ``load_excel``, ``preprocess_dataframe`` and ``find_discrepancies``
+separately, with each of ``--engines`` when given. Timings are the median of
+``--repeat`` runs; peak allocations come from one extra run under
+``tracemalloc``. Results are written as JSON and, with ``--baseline``, compared
+against a stored run so regressions are flagged through the exit code.
+"""
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from instrumentation import StageRecorder
+
+ID_FORMATS = ("numeric", "padded", "prefixed", "mixed")
+
+# Excel sheets hold at most 1,048,576 rows including headers and totals
+XLSX_MAX_ROWS = 1_000_000
+
+# Timing differences below this many seconds are treated as noise
+NOISE_SECONDS = 0.05
+
+JUNK_ROWS = [
+    ["Реестр заказов"],
+    ["Период: 01.01.2024 - 31.01.2024"],
+    ["Сформирован автоматически"],
+    [],
+]
+
+
+def _make_ids(count: int, id_format: str, rng) -> List:
+    """Create unique order IDs in the requested format."""
+    numbers = rng.permutation(count) + 100000
+    if id_format == "numeric":
+        return numbers.tolist()
+    if id_format == "padded":
+        return [f"{n:010d}" for n in numbers]
+    if id_format == "prefixed":
+        return [f"ORD-{n}" for n in numbers]
+    # Mixed exports hold plain numbers alongside prefixed text IDs
+    return [n if n % 3 else f"ORD-{n}" for n in numbers.tolist()]
+
+
+def generate_pair(
+    out_dir: Path,
+    rows: int,
+    id_format: str = "numeric",
+    duplicate_rate: float = 0.01,
+    mismatch_rate: float = 0.02,
+    junk_rows: int = 3,
+    totals: bool = True,
+    file_format: str = "xlsx",
+    seed: int = 0,
+) -> Tuple[Path, Path, int]:
+    """Write a synthetic registry/act pair resembling real exports.
+
+    Mismatches are split between changed amounts, IDs missing from the act
+    and IDs present only in the act. Duplicated rows repeat an ID later in the
+    file, so the first occurrence still decides its amount. Files generated
+    earlier with the same parameters are reused.
+
+    Args:
+        out_dir: Directory for the generated files
+        rows: Number of distinct IDs in the registry
+        id_format: One of ``ID_FORMATS``
+        duplicate_rate: Share of rows repeated with a different amount
+        mismatch_rate: Share of IDs whose comparison yields a discrepancy
+        junk_rows: Title rows written above the header (at most 4)
+        totals: Whether to end each file with an "Итого"/"Total" row
+        file_format: ``xlsx``, ``csv`` or ``parquet`` (which has no junk rows)
+        seed: Random seed, so equal parameters give identical files
+
+    Returns:
+        Registry path, act path and the expected number of discrepancies
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    name = (
+        f"{rows}_{id_format}_d{duplicate_rate:g}_m{mismatch_rate:g}"
+        f"_j{junk_rows}_t{int(totals)}_s{seed}"
+    )
+    registry = out_dir / f"registry_{name}.{file_format}"
+    act = out_dir / f"act_{name}.{file_format}"
+
+    mismatches = int(rows * mismatch_rate)
+    if registry.exists() and act.exists():
+        return registry, act, mismatches
+
+    extra = mismatches // 4
+    missing = mismatches // 4
+    changed = mismatches - extra - missing
+
+    ids = _make_ids(rows + extra, id_format, rng)
+    reg_ids, extra_ids = ids[:rows], ids[rows:]
+    reg_amounts = rng.integers(100, 10_000_000, rows) / 100
+
+    # Act: drop "missing" IDs, change some amounts, append act-only IDs
+    act_amounts = reg_amounts.copy()
+    act_amounts[missing : missing + changed] += rng.integers(1, 100_000, changed) / 100
+    act_ids = reg_ids[missing:] + extra_ids
+    act_amounts = np.concatenate(
+        [act_amounts[missing:], rng.integers(100, 10_000_000, extra) / 100]
+    )
+    act_order = rng.permutation(len(act_ids))
+    act_ids = [act_ids[i] for i in act_order]
+    act_amounts = act_amounts[act_order]
+
+    for path, side_ids, amounts, header, total_label in (
+        (
+            registry,
+            reg_ids,
+            reg_amounts,
+            ["№", "Идентификатор заказа", "Сумма"],
+            "Итого",
+        ),
+        (act, act_ids, act_amounts, ["No", "Order ID", "Amount"], "Total"),
+    ):
+        dupes = rng.choice(len(side_ids), int(len(side_ids) * duplicate_rate))
+        side_ids = list(side_ids) + [side_ids[i] for i in dupes]
+        amounts = np.concatenate([amounts, amounts[dupes] + 1]).round(2)
+        body = [
+            [n, id_, float(amount)]
+            for n, (id_, amount) in enumerate(zip(side_ids, amounts), 1)
+        ]
+        if totals:
+            body.append(["", total_label, round(float(amounts.sum()), 2)])
+        _write_table(path, JUNK_ROWS[:junk_rows], header, body, file_format)
+
+    return registry, act, mismatches
+
+
+def _write_table(
+    path: Path, junk: List[List], header: List, body: List[List], file_format: str
+) -> None:
+    if file_format == "csv":
+        import csv
+
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerows(junk)
+            writer.writerow(header)
+            writer.writerows(body)
+        return
+
+    if file_format == "parquet":
+        import pandas as pd
+
+        # Column names are the header; IDs and the total label share a column
+        frame = pd.DataFrame(body, columns=header)
+        frame[header[:2]] = frame[header[:2]].astype(str)
+        frame.to_parquet(path, index=False)
+        return
+
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    sheet = wb.create_sheet("Sheet1")
+    for row in junk + [header] + body:
+        sheet.append(row)
+    wb.save(path)
+
+
+def _stage_totals(records: List[Dict]) -> Dict[str, Dict]:
+    """Sum the records of each stage, keeping the largest memory peaks."""
+    stages: Dict[str, Dict] = {}
+    for record in records:
+        entry = stages.setdefault(record["stage"], {"seconds": 0.0, "rows": 0})
+        entry["seconds"] += record["seconds"]
+        entry["rows"] += record["rows"]
+        for key in ("peak_rss_mb", "alloc_peak_mb"):
+            if key in record:
+                entry[key] = max(entry.get(key, 0.0), record[key])
+    return stages
+
+
+def run_pipeline(
+    processor, registry: Path, act: Path, trace_allocations: bool = False
+) -> Tuple[Dict[str, Dict], int]:
+    """Run the comparison stages once, returning their measurements."""
+    recorder = StageRecorder(trace_allocations)
+    with recorder.stage("load_excel") as record:
+        reg_df, reg_id, reg_amt = processor.load_excel(registry)
+        record["rows"] = len(reg_df)
+    with recorder.stage("load_excel") as record:
+        act_df, act_id, act_amt = processor.load_excel(act)
+        record["rows"] = len(act_df)
+
+    with recorder.stage("preprocess_dataframe", rows=len(reg_df)):
+        reg_clean = processor.preprocess_dataframe(reg_df, reg_id, reg_amt)
+    with recorder.stage("preprocess_dataframe", rows=len(act_df)):
+        act_clean = processor.preprocess_dataframe(act_df, act_id, act_amt)
+
+    with recorder.stage("find_discrepancies", rows=len(reg_clean) + len(act_clean)):
+        diffs = processor.find_discrepancies(
+            reg_clean, act_clean, reg_id, reg_amt, act_id, act_amt
+        )
+    return _stage_totals(recorder.records), len(diffs)
+
+
+def run_case(
+    processor, registry: Path, act: Path, repeat: int, memory: bool
+) -> Tuple[Dict[str, Dict], int]:
+    """Time each stage over ``repeat`` runs and measure allocations once."""
+    runs = []
+    for _ in range(repeat):
+        measured, found = run_pipeline(processor, registry, act)
+        runs.append(measured)
+
+    stages = {}
+    for name in runs[0]:
+        seconds = [run[name]["seconds"] for run in runs]
+        stages[name] = {
+            "seconds": statistics.median(seconds),
+            "min_seconds": min(seconds),
+            "rows": runs[0][name]["rows"],
+            "peak_rss_mb": max(run[name]["peak_rss_mb"] for run in runs),
+        }
+
+    if memory:
+        measured, _ = run_pipeline(processor, registry, act, trace_allocations=True)
+        for name, entry in measured.items():
+            stages[name]["peak_mb"] = entry["alloc_peak_mb"]
+    return stages, found
+
+
+def compare_to_baseline(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Return a message for every stage slower or larger than the baseline."""
+    previous = {case["name"]: case for case in baseline.get("cases", [])}
+    regressions = []
+    for case in results["cases"]:
+        base = previous.get(case["name"])
+        if base is None:
+            continue
+        for stage, entry in case["stages"].items():
+            old = base["stages"].get(stage)
+            if old is None:
+                continue
+            limit = old["seconds"] * (1 + tolerance)
+            if entry["seconds"] > limit and entry["seconds"] - old["seconds"] > (
+                NOISE_SECONDS
+            ):
+                regressions.append(
+                    f"{case['name']} {stage}: {entry['seconds']:.3f}s "
+                    f"(baseline {old['seconds']:.3f}s)"
+                )
+            if "peak_mb" in entry and "peak_mb" in old:
+                if entry["peak_mb"] > old["peak_mb"] * (1 + tolerance):
+                    regressions.append(
+                        f"{case['name']} {stage}: {entry['peak_mb']:.1f} MB "
+                        f"(baseline {old['peak_mb']:.1f} MB)"
+                    )
+    return regressions
+
+
+def _environment() -> Dict[str, str]:
+    import numpy as np
+    import openpyxl
+    import pandas as pd
+
+    from logic import installed_excel_engines
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "openpyxl": openpyxl.__version__,
+        "excel_engines": ", ".join(installed_excel_engines()),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the command-line argument parser."""
+    parser = argparse.ArgumentParser(
+        prog="python -m bench",
+        description="Benchmark the comparison pipeline on generated files.",
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[10000, 100000],
+        help="registry sizes to benchmark (default: 10000 100000)",
+    )
+    parser.add_argument("--id-format", choices=ID_FORMATS, default="numeric")
+    parser.add_argument("--duplicate-rate", type=float, default=0.01)
+    parser.add_argument("--mismatch-rate", type=float, default=0.02)
+    parser.add_argument(
+        "--junk-rows",
+        type=int,
+        choices=range(len(JUNK_ROWS) + 1),
+        default=3,
+        help="title rows above the header",
+    )
+    parser.add_argument(
+        "--no-totals", action="store_true", help="omit the Итого/Total rows"
+    )
+    parser.add_argument("--format", choices=["xlsx", "csv", "parquet"], default="xlsx")
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        choices=["calamine", "openpyxl", "xlrd"],
+        help="Excel engines to compare on the same files (default: config.yaml)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="timed runs per case (median)"
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip the tracemalloc run"
+    )
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        default=Path("bench_data"),
+        help="where generated files are kept and reused",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=Path("bench_results.json"),
+        help="results file",
+    )
+    parser.add_argument("--baseline", type=Path, help="results file to compare to")
+    parser.add_argument(
+        "--save-baseline", type=Path, help="also store the results as a baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed slowdown or memory growth over the baseline (0.2 = 20%%)",
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmarks, returning 1 if a regression was detected."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.format == "xlsx" and max(args.rows) > XLSX_MAX_ROWS:
+        parser.error(f"xlsx holds at most {XLSX_MAX_ROWS} rows, use --format csv")
+    logging.basicConfig(level=logging.WARNING)
+
+    from logic import ExcelProcessor, installed_excel_engines, load_config
+
+    config = load_config()
+    results = {"environment": _environment(), "cases": []}
+    failed = False
+    engines = [None]
+    if args.engines:
+        engines = [e for e in args.engines if e in installed_excel_engines()]
+        for engine in sorted(set(args.engines) - set(engines)):
+            print(f"Skipping {engine}: not installed", file=sys.stderr)
+    for rows, engine in [(rows, engine) for rows in args.rows for engine in engines]:
+        processor = ExcelProcessor(
+            dict(config, excel=dict(config["excel"], engine=engine))
+            if engine
+            else config
+        )
+        registry, act, expected = generate_pair(
+            args.data_dir,
+            rows,
+            args.id_format,
+            args.duplicate_rate,
+            args.mismatch_rate,
+            args.junk_rows,
+            not args.no_totals,
+            args.format,
+            args.seed,
+        )
+        stages, found = run_case(
+            processor, registry, act, max(args.repeat, 1), not args.no_memory
+        )
+        name = registry.stem.replace("registry_", "")
+        if engine is not None:
+            name = f"{name}_{engine}"
+        results["cases"].append(
+            {"name": name, "expected": expected, "found": found, "stages": stages}
+        )
+        print(f"{name}: {found} discrepancies (expected {expected})")
+        for stage, entry in stages.items():
+            memory = f"  {entry['peak_mb']:9.1f} MB" if "peak_mb" in entry else ""
+            print(f"  {stage:<22}{entry['seconds']:9.3f} s{memory}")
+        if found != expected:
+            print(f"  mismatch: expected {expected} discrepancies", file=sys.stderr)
+            failed = True
+
+    args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        if regressions:
+            failed = True
+        else:
+            print(f"No regressions against {args.baseline}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
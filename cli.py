@@ -0,0 +1,458 @@
+"""Headless command-line interface for batch comparisons.
+
+Usage examples::
+
+    python -m cli --pair registry.xlsx act.xlsx
+    python -m cli --manifest pairs.csv --workers 4 --output reports
+    python -m cli --registry-glob "in/*_registry.xlsx" --act-glob "in/*_act.xlsx"
+    python -m cli --registry master.xlsx --acts "acts/*.xlsx" --output reports
+    python -m cli --runs
+    python -m cli --diff-runs 12 15 --format csv
+
+Heavy modules (pandas, openpyxl) are imported only once a comparison runs,
+so argument errors and ``--help`` return immediately. PyQt5 is never loaded.
+"""
+
+import argparse
+import csv
+import glob
+import json
+import logging
+import multiprocessing
+import re
+import sqlite3
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SUMMARY_FIELDS = [
+    "name",
+    "registry",
+    "act",
+    "status",
+    "discrepancies",
+    "near_matches",
+    "run",
+    "registry_total",
+    "act_total",
+    "seconds",
+    "report",
+    "error",
+]
+
+
+def _pair(registry, act, name: Optional[str] = None) -> Dict[str, str]:
+    """Build a pair description with a report name derived from the file names."""
+    registry, act = Path(registry), Path(act)
+    return {
+        "name": name or f"{registry.stem}__{act.stem}",
+        "registry": str(registry),
+        "act": str(act),
+    }
+
+
+def read_manifest(path: Path) -> List[Dict[str, str]]:
+    """Read registry/act pairs from a CSV, JSON or YAML manifest.
+
+    CSV manifests need ``registry`` and ``act`` columns; JSON and YAML
+    manifests hold a list of mappings with the same keys. An optional ``name``
+    sets the report file name. Relative paths are resolved against the
+    manifest's directory.
+    """
+    if path.suffix.lower() == ".csv":
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            entries = list(csv.DictReader(f))
+    elif path.suffix.lower() == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+    else:
+        import yaml
+
+        with open(path, "r", encoding="utf-8") as f:
+            entries = yaml.safe_load(f)
+
+    pairs = []
+    for entry in entries or []:
+        if not entry.get("registry") or not entry.get("act"):
+            raise ValueError(f"Manifest entry needs 'registry' and 'act': {entry}")
+        pairs.append(
+            _pair(
+                path.parent / entry["registry"],
+                path.parent / entry["act"],
+                entry.get("name") or None,
+            )
+        )
+    return pairs
+
+
+def _glob_matches(pattern: str) -> Dict[tuple, str]:
+    """Map the wildcard-matched parts of each file to its path."""
+    regex = re.escape(Path(pattern).as_posix())
+    regex = regex.replace(r"\*", "(.*)").replace(r"\?", "(.)")
+    compiled = re.compile(f"^{regex}$")
+    matches = {}
+    for found in sorted(glob.glob(pattern)):
+        m = compiled.match(Path(found).as_posix())
+        if m:
+            matches[m.groups()] = found
+    return matches
+
+
+def pair_globs(registry_glob: str, act_glob: str) -> List[Dict[str, str]]:
+    """Pair registries and acts whose wildcard-matched name parts are equal."""
+    registries = _glob_matches(registry_glob)
+    acts = _glob_matches(act_glob)
+    for key in sorted(set(registries) ^ set(acts)):
+        path = registries.get(key) or acts.get(key)
+        logging.warning("No counterpart found for %s", path)
+    return [
+        _pair(registries[key], acts[key], "_".join(key) or None)
+        for key in sorted(set(registries) & set(acts))
+    ]
+
+
+def run_pair(
+    config: Dict, pair: Dict[str, str], output_dir: str, report_format: str = "txt"
+) -> Dict:
+    """Compare one registry/act pair and write its report.
+
+    Runs inside a worker process; errors are reported in the returned summary
+    row instead of being raised. With ``fuzzy.enabled``, near-matched IDs are
+    written next to the report as ``<name>_near_matches.<format>``. With
+    ``history.enabled``, the result is saved to the run history.
+    """
+    from export import export_discrepancies
+    from history import open_history
+    from logic import ExcelProcessor
+    from matching import near_matches
+    from streaming import PartitionedComparison, needs_partitioning
+
+    row = dict(pair, status="ok", error="")
+    started = time.perf_counter()
+    try:
+        processor = ExcelProcessor(config)
+        paths = [Path(pair["registry"]), Path(pair["act"])]
+        if needs_partitioning(config, paths):
+            comparison = PartitionedComparison(processor)
+            diffs = comparison.compare(paths[:1], paths[1:])
+            totals = comparison.totals["registry"], comparison.totals["act"]
+        else:
+            loaded = processor.load_sides([paths[:1], paths[1:]])
+            (reg_df, reg_id, reg_amt), (act_df, act_id, act_amt) = loaded
+            diffs = processor.find_discrepancies(
+                reg_df, act_df, reg_id, reg_amt, act_id, act_amt
+            )
+            totals = reg_df[reg_amt].sum(), act_df[act_amt].sum()
+
+        report = Path(output_dir) / f"{pair['name']}.{report_format}"
+        export_discrepancies(diffs, report)
+        if config["fuzzy"]["enabled"]:
+            matches = near_matches(diffs, config["fuzzy"]["min_confidence"])
+            export_discrepancies(
+                matches,
+                report.with_name(f"{pair['name']}_near_matches.{report_format}"),
+            )
+            row["near_matches"] = len(matches)
+        history = open_history(config)
+        if history is not None:
+            try:
+                row["run"] = history.save_run(diffs, paths[:1], paths[1:], config)
+            except (sqlite3.Error, OSError):
+                # The report is written; a history failure only gets logged
+                logging.exception("Failed to save the run to %s", history.path)
+        row.update(
+            discrepancies=len(diffs),
+            registry_total=f"{totals[0]:.2f}",
+            act_total=f"{totals[1]:.2f}",
+            report=str(report),
+        )
+    except (FileNotFoundError, ValueError, RuntimeError, OSError) as e:
+        logging.exception("Failed to compare %s", pair["name"])
+        row.update(status="error", error=str(e))
+    row["seconds"] = f"{time.perf_counter() - started:.2f}"
+    return row
+
+
+def run_batch(
+    pairs: List[Dict[str, str]],
+    output_dir: Path,
+    workers: int,
+    config: Dict,
+    report_format: str = "txt",
+) -> List[Dict]:
+    """Compare all pairs in a process pool and write the summary file."""
+    from logic import worker_count
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # Pairs already run in parallel; loading inside a pair stays in-process
+    config = dict(config, loading=dict(config["loading"], processes=1))
+    workers = min(worker_count(workers), len(pairs))
+
+    rows = []
+    if workers <= 1:
+        for pair in pairs:
+            try:
+                rows.append(run_pair(config, pair, str(output_dir), report_format))
+            except Exception as e:
+                rows.append(_failed_row(pair, e))
+            _print_row(rows[-1])
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = {
+                pool.submit(
+                    run_pair, config, pair, str(output_dir), report_format
+                ): pair
+                for pair in pairs
+            }
+            for future in as_completed(futures):
+                # A crashed worker or an unexpected error fails only its pair
+                try:
+                    rows.append(future.result())
+                except Exception as e:
+                    rows.append(_failed_row(futures[future], e))
+                _print_row(rows[-1])
+
+    order = {pair["name"]: i for i, pair in enumerate(pairs)}
+    rows.sort(key=lambda r: order[r["name"]])
+    with open(output_dir / "summary.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
+
+def run_acts(
+    config: Dict,
+    registry: Path,
+    acts: List[Path],
+    output_dir: Path,
+    report_format: str = "txt",
+) -> None:
+    """Compare one registry with several acts and write one report per act.
+
+    Registry rows found in no act go to ``not_in_any_act``; the per-act
+    counts and totals go to ``acts_summary.csv``.
+    """
+    from batch import compare_acts
+    from export import export_discrepancies
+    from logic import ExcelProcessor
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    result = compare_acts(ExcelProcessor(config), [registry], acts)
+    for path, (name, diffs) in zip(acts, result.acts.items()):
+        # Repeated file names keep the "(2)" suffix given by act_names
+        stem = path.stem + name[len(path.name) :]
+        export_discrepancies(diffs, output_dir / f"{stem}.{report_format}")
+        print(f"{name}: {len(diffs)} discrepancies")
+    export_discrepancies(
+        result.uncovered, output_dir / f"not_in_any_act.{report_format}"
+    )
+    result.summary.to_csv(output_dir / "acts_summary.csv", index=False)
+    print(
+        f"{len(result.uncovered)} registry IDs not in any act, "
+        f"summary: {output_dir / 'acts_summary.csv'}"
+    )
+
+
+def show_history(
+    config: Dict,
+    output_dir: Path,
+    report_format: str,
+    run: Optional[int] = None,
+    changes: Optional[List[int]] = None,
+) -> None:
+    """List saved runs, or write one run or the changes between two runs.
+
+    A run is written to ``run_<run>``, the changes between runs to
+    ``changes_<old>_<new>``; without either, the runs are printed.
+    """
+    from export import export_discrepancies
+    from history import open_history
+
+    history = open_history(config)
+    if history is None:
+        raise ValueError("Run history is disabled (history.enabled in config.yaml)")
+    if run is None and changes is None:
+        print(history.runs().to_string(index=False))
+        return
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if run is not None:
+        frame = history.load_run(run)
+        report = output_dir / f"run_{run}.{report_format}"
+    else:
+        old, new = sorted(changes)
+        frame = history.diff_runs(old, new)
+        report = output_dir / f"changes_{old}_{new}.{report_format}"
+    export_discrepancies(frame, report)
+    print(f"{len(frame)} rows written to {report}")
+
+
+def _failed_row(pair: Dict[str, str], error: Exception) -> Dict:
+    """Build the summary row of a pair whose comparison raised."""
+    logging.error("Failed to compare %s", pair["name"], exc_info=error)
+    return dict(pair, status="error", error=str(error) or type(error).__name__)
+
+
+def _print_row(row: Dict) -> None:
+    if row["status"] == "ok":
+        print(f"{row['name']}: {row['discrepancies']} discrepancies")
+    else:
+        print(f"{row['name']}: ERROR {row['error']}", file=sys.stderr)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the command-line argument parser."""
+    parser = argparse.ArgumentParser(
+        prog="python -m cli",
+        description="Compare registry and act files without the GUI.",
+    )
+    parser.add_argument(
+        "--pair",
+        nargs=2,
+        action="append",
+        default=[],
+        metavar=("REGISTRY", "ACT"),
+        help="registry and act file to compare (repeatable)",
+    )
+    parser.add_argument(
+        "--manifest", type=Path, help="CSV/JSON/YAML file listing registry/act pairs"
+    )
+    parser.add_argument("--registry-glob", help="glob pattern matching registries")
+    parser.add_argument("--act-glob", help="glob pattern matching acts")
+    parser.add_argument(
+        "--registry", type=Path, help="registry compared with every file of --acts"
+    )
+    parser.add_argument(
+        "--acts",
+        nargs="+",
+        metavar="ACT",
+        help="acts (files or glob patterns) compared with --registry",
+    )
+    parser.add_argument(
+        "-o", "--output", type=Path, default=Path("reports"), help="report directory"
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=["txt", "csv", "xlsx", "parquet"],
+        default="txt",
+        help="report format (default: tab-separated txt)",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=0,
+        help="pairs compared in parallel (0 = one per CPU core)",
+    )
+    parser.add_argument(
+        "--epsilon", type=float, help="override the epsilon from config.yaml"
+    )
+    parser.add_argument(
+        "--sheets",
+        help='sheets of each workbook to compare, e.g. "*" (default: first sheet)',
+    )
+    parser.add_argument(
+        "--runs", action="store_true", help="list the runs saved in the history"
+    )
+    parser.add_argument(
+        "--show-run", type=int, metavar="RUN", help="write a saved run's report"
+    )
+    parser.add_argument(
+        "--diff-runs",
+        type=int,
+        nargs=2,
+        metavar=("OLD", "NEW"),
+        help="write the new, resolved and changed discrepancies between two runs",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="log progress")
+    return parser
+
+
+def _load_config(args: argparse.Namespace) -> Dict:
+    """Load config.yaml with the overrides given on the command line."""
+    from logic import load_config
+
+    config = load_config()
+    if args.epsilon is not None:
+        config["epsilon"] = args.epsilon
+    if args.sheets is not None:
+        config["excel"]["sheets"] = args.sheets
+    return config
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the command-line interface, returning the process exit code."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if bool(args.registry_glob) != bool(args.act_glob):
+        parser.error("--registry-glob and --act-glob must be used together")
+    if bool(args.registry) != bool(args.acts):
+        parser.error("--registry and --acts must be used together")
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+
+    if args.runs or args.show_run is not None or args.diff_runs:
+        try:
+            show_history(
+                _load_config(args),
+                args.output,
+                args.format,
+                args.show_run,
+                args.diff_runs,
+            )
+        except (ValueError, OSError, sqlite3.Error) as e:
+            logging.exception("Reading the run history failed")
+            print(f"ERROR {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    if args.registry:
+        acts = [Path(p) for pattern in args.acts for p in sorted(glob.glob(pattern))]
+        if not acts:
+            parser.error("--acts matched no files")
+        try:
+            run_acts(_load_config(args), args.registry, acts, args.output, args.format)
+        except (FileNotFoundError, ValueError, RuntimeError, OSError) as e:
+            logging.exception("Batch comparison failed")
+            print(f"ERROR {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    pairs = [_pair(registry, act) for registry, act in args.pair]
+    try:
+        if args.manifest:
+            pairs.extend(read_manifest(args.manifest))
+    except (OSError, ValueError) as e:
+        parser.error(f"Cannot read manifest: {e}")
+    if args.registry_glob:
+        pairs.extend(pair_globs(args.registry_glob, args.act_glob))
+    if not pairs:
+        parser.error("no registry/act pairs given")
+
+    counts = Counter(pair["name"] for pair in pairs)
+    duplicates = sorted(name for name, count in counts.items() if count > 1)
+    if duplicates:
+        parser.error(f"duplicate report names: {', '.join(duplicates)}")
+
+    config = _load_config(args)
+    rows = run_batch(pairs, args.output, args.workers, config, args.format)
+    failed = sum(row["status"] != "ok" for row in rows)
+    print(
+        f"{len(rows) - failed}/{len(rows)} pairs compared, "
+        f"summary: {args.output / 'summary.csv'}"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
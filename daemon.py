@@ -0,0 +1,450 @@
+"""Headless daemon comparing acts as they are dropped into watched folders.
+
+Usage::
+
+    python -m daemon            # run until interrupted
+    python -m daemon --once     # compare what is already there and exit
+
+Each folder in ``watch.folders`` of config.yaml is mapped to a registry.
+New or changed act files are compared once their size and modification time
+have been stable for ``watch.settle_seconds``, so files still being copied
+are left alone. Folders are watched with watchdog (inotify and its
+counterparts on Windows and macOS) when it is installed, and polled
+otherwise. Ready files become jobs in a bounded queue run by a process pool;
+while the queue is full, new files stay on disk until a slot frees up.
+Reports go to ``watch.output`` as with ``python -m cli``, prefixed with the
+folder name and a short hash of its path so that acts of the same name in
+different folders do not overwrite each other; a JSON status file there shows
+the queue, throughput and latency.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from cli import SUMMARY_FIELDS, _pair, run_pair
+from resources import load_config
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+# Files the comparison can read
+ACT_SUFFIXES = (".xlsx", ".xls", ".csv", ".tsv", ".parquet", ".feather", ".arrow")
+
+# Name patterns of lock, temporary and partial download files
+IGNORED_NAMES = ("~$*", ".*", "*.part", "*.tmp", "*.crdownload")
+
+# Jobs whose latency and duration the status file summarises
+RECENT_JOBS = 100
+
+# Throughput is the number of jobs finished in this many seconds, per minute
+THROUGHPUT_WINDOW = 600
+
+# Minimum interval between status file updates
+STATUS_INTERVAL = 1.0
+
+
+class Job(NamedTuple):
+    """One act compared against the registry of its folder."""
+
+    pair: Dict[str, str]
+    detected: float  # time.time() when the file was first seen in this state
+
+
+class FolderScanner:
+    """Finds act files in one watched folder that are ready to compare.
+
+    A file is ready once its size and modification time stayed the same for
+    ``settle_seconds`` and it can be opened. Each version of a file is
+    reported once; a file written again is reported again.
+    """
+
+    def __init__(self, folder: Path, registry: Path, pattern: str, settle: float):
+        self.folder = folder
+        self.registry = registry
+        self.pattern = pattern
+        self.settle = settle
+        self.settling: Dict[Path, Tuple[Tuple[int, int], float, float]] = {}
+        self.done: Dict[Path, Tuple[int, int]] = {}
+        # Settled files that cannot be opened, with the time each was first seen
+        self.locked: Dict[Path, float] = {}
+        digest = hashlib.sha1(str(folder.resolve()).encode("utf-8")).hexdigest()
+        self.prefix = f"{folder.resolve().name}-{digest[:8]}"
+
+    def pair(self, path: Path) -> Dict[str, str]:
+        """Describe the comparison of an act, with a report name unique per folder."""
+        pair = _pair(self.registry, path)
+        pair["name"] = f"{self.prefix}__{pair['name']}"
+        return pair
+
+    def _candidates(self) -> List[Path]:
+        try:
+            entries = list(os.scandir(self.folder))
+        except OSError:
+            logging.exception("Cannot list %s", self.folder)
+            return []
+        return sorted(
+            Path(entry.path)
+            for entry in entries
+            if entry.is_file()
+            and Path(entry.name).suffix.lower() in ACT_SUFFIXES
+            and fnmatchcase(entry.name.lower(), self.pattern.lower())
+            and not any(fnmatchcase(entry.name, p) for p in IGNORED_NAMES)
+            and Path(entry.path).resolve() != self.registry.resolve()
+        )
+
+    def scan(self, now: float) -> List[Tuple[Path, float]]:
+        """Return the files that became ready, with the time each was first seen."""
+        ready = []
+        present = set()
+        self.locked = {}
+        for path in self._candidates():
+            present.add(path)
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            state = (stat.st_size, stat.st_mtime_ns)
+            if self.done.get(path) == state:
+                continue
+            previous = self.settling.get(path)
+            if previous is None or previous[0] != state:
+                # New or still growing: wait until it stays unchanged
+                first_seen = previous[2] if previous else now
+                self.settling[path] = (state, now, first_seen)
+                continue
+            if now - previous[1] < self.settle:
+                continue
+            if not _readable(path):
+                self.locked[path] = previous[2]
+                continue
+            ready.append((path, previous[2]))
+        for path in set(self.settling) - present:
+            del self.settling[path]
+        return ready
+
+    def mark_queued(self, path: Path) -> None:
+        """Remember the current version of a file as handled."""
+        state, _, _ = self.settling.pop(path)
+        self.done[path] = state
+
+    def skip_reported(self, output_dir: Path, report_format: str) -> None:
+        """Treat files whose report is newer than the file as already handled.
+
+        Used on startup, so a restarted daemon does not redo finished work.
+        """
+        for path in self._candidates():
+            report = output_dir / f"{self.pair(path)['name']}.{report_format}"
+            try:
+                stat = path.stat()
+                if report.stat().st_mtime_ns >= stat.st_mtime_ns:
+                    self.done[path] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                continue
+
+
+def _readable(path: Path) -> bool:
+    """Whether the file can be opened; writers on Windows keep it locked."""
+    try:
+        with open(path, "rb"):
+            return True
+    except OSError:
+        return False
+
+
+def _ignore_interrupts() -> None:
+    """Leave Ctrl+C to the daemon, which lets running jobs finish."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    """Nearest-rank median, 95th percentile and maximum of a list of seconds."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(share: float) -> float:
+        return round(ordered[max(0, int(share * len(ordered) + 0.5) - 1)], 3)
+
+    return {"p50": rank(0.5), "p95": rank(0.95), "max": round(ordered[-1], 3)}
+
+
+class WatchDaemon:
+    """Watches folders, queues ready acts and compares them in a process pool."""
+
+    def __init__(self, config: Dict):
+        from logic import worker_count
+
+        settings = config["watch"]
+        # Jobs already run in parallel; loading inside a job stays in-process
+        self.config = dict(config, loading=dict(config["loading"], processes=1))
+        self.output_dir = Path(settings["output"])
+        self.report_format = settings["format"]
+        self.poll_seconds = settings["poll_seconds"]
+        self.queue_size = settings["queue_size"]
+        self.workers = worker_count(settings["workers"])
+        self.status_path = self.output_dir / settings["status_file"]
+        self.scanners = [
+            FolderScanner(
+                Path(entry["path"]),
+                Path(entry["registry"]),
+                entry.get("pattern") or "*",
+                settings["settle_seconds"],
+            )
+            for entry in settings["folders"]
+        ]
+        self.queue: Deque[Job] = deque()
+        self.running: Dict = {}  # future -> (job, submitted time)
+        self.recent: Deque[Dict] = deque(maxlen=RECENT_JOBS)
+        self.finished_times: Deque[float] = deque()
+        self.completed = 0
+        self.failed = 0
+        self.started = time.time()
+        self.wake = threading.Event()
+        self.stopping = False
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self._status_written = 0.0
+
+    def stop(self, *_) -> None:
+        """Stop taking new files; running jobs are finished first."""
+        self.stopping = True
+        self.wake.set()
+
+    def run(self, once: bool = False) -> None:
+        """Process files until stopped, or until the folders are idle if once."""
+        if not self.scanners:
+            raise ValueError("No folders to watch: set watch.folders in config.yaml")
+        for scanner in self.scanners:
+            if not scanner.registry.is_file():
+                raise FileNotFoundError(f"Registry not found: {scanner.registry}")
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        for scanner in self.scanners:
+            scanner.skip_reported(self.output_dir, self.report_format)
+
+        observer = None if once else self._start_observer()
+        try:
+            while not self.stopping or self.running:
+                self.wake.clear()
+                self._collect()
+                if not self.stopping:
+                    self._enqueue(time.time(), once)
+                    self._dispatch()
+                self._write_status(observer is not None)
+                if (
+                    once
+                    and not (self.running or self.queue)
+                    and not any(s.settling for s in self.scanners)
+                ):
+                    break
+                self.wake.wait(self._timeout(observer is not None))
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            if self.pool is not None:
+                self.pool.shutdown()
+            self._write_status(observer is not None, force=True)
+
+    def _timeout(self, watching: bool) -> float:
+        """Seconds to sleep; with events, only settling files need re-checks."""
+        if not watching or any(s.settling for s in self.scanners):
+            return self.poll_seconds
+        return 60.0
+
+    def _start_observer(self):
+        """Wake the loop on file system events, if watchdog is installed."""
+        if Observer is None:
+            logging.info(
+                "watchdog is not installed, polling every %s s", self.poll_seconds
+            )
+            return None
+        wake = self.wake
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                wake.set()
+
+        observer = Observer()
+        for scanner in self.scanners:
+            observer.schedule(Handler(), str(scanner.folder), recursive=False)
+        observer.start()
+        return observer
+
+    def _enqueue(self, now: float, once: bool = False) -> None:
+        """Queue ready files while there is room; the rest wait on disk.
+
+        A settled file that cannot be opened (locked, or no permission) is
+        waited for while watching; with ``once`` it is reported as failed, so
+        that the run ends.
+        """
+        for scanner in self.scanners:
+            ready = scanner.scan(now)
+            if once:
+                for path, detected in scanner.locked.items():
+                    scanner.mark_queued(path)
+                    job = Job(scanner.pair(path), detected)
+                    error = f"Cannot open {path}"
+                    self._record(job, dict(job.pair, status="error", error=error), now)
+            for path, detected in ready:
+                if len(self.queue) >= self.queue_size:
+                    return
+                scanner.mark_queued(path)
+                self.queue.append(Job(scanner.pair(path), detected))
+                logging.info("Queued %s", path)
+
+    def _dispatch(self) -> None:
+        """Start queued jobs while workers are free."""
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_ignore_interrupts,
+            )
+        while self.queue and len(self.running) < self.workers:
+            job = self.queue.popleft()
+            future = self.pool.submit(
+                run_pair,
+                self.config,
+                job.pair,
+                str(self.output_dir),
+                self.report_format,
+            )
+            future.add_done_callback(lambda _: self.wake.set())
+            self.running[future] = (job, time.time())
+
+    def _collect(self) -> None:
+        """Record finished jobs in the status and in the daemon summary file."""
+        for future in [f for f in self.running if f.done()]:
+            job, submitted = self.running.pop(future)
+            try:
+                row = future.result()
+            except Exception as e:
+                # One failed job must not stop the daemon
+                logging.exception("Worker failed comparing %s", job.pair["act"])
+                error = str(e) or type(e).__name__
+                row = dict(job.pair, status="error", error=error, seconds="")
+                if isinstance(e, BrokenProcessPool) and self.pool is not None:
+                    # A worker died; the next dispatch starts a new pool
+                    self.pool.shutdown(wait=False)
+                    self.pool = None
+            self._record(job, row, submitted)
+
+    def _record(self, job: Job, row: Dict, submitted: float) -> None:
+        """Count a finished job and add it to the status and summary file."""
+        finished = time.time()
+        row["latency"] = round(finished - job.detected, 3)
+        row["waited"] = round(submitted - job.detected, 3)
+        if row["status"] == "ok":
+            self.completed += 1
+            logging.info("%s: %s discrepancies", row["name"], row["discrepancies"])
+        else:
+            self.failed += 1
+            logging.error("%s: %s", row["name"], row["error"])
+        self.recent.append(row)
+        self.finished_times.append(finished)
+        self._append_summary(row)
+
+    def _append_summary(self, row: Dict) -> None:
+        path = self.output_dir / "daemon_summary.csv"
+        fields = SUMMARY_FIELDS + ["waited", "latency"]
+        new = not path.exists()
+        with open(path, "a", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+            if new:
+                writer.writeheader()
+            writer.writerow(row)
+
+    def status(self, watching: bool) -> Dict:
+        """Return the queue, throughput and latency figures of the daemon."""
+        now = time.time()
+        while self.finished_times and now - self.finished_times[0] > THROUGHPUT_WINDOW:
+            self.finished_times.popleft()
+        window = min(THROUGHPUT_WINDOW, max(now - self.started, 1.0))
+        return {
+            "updated": datetime.now().isoformat(timespec="seconds"),
+            "started": datetime.fromtimestamp(self.started).isoformat(
+                timespec="seconds"
+            ),
+            "watcher": "events" if watching else "polling",
+            "folders": [str(s.folder) for s in self.scanners],
+            "settling": sum(len(s.settling) for s in self.scanners),
+            "queued": len(self.queue),
+            "running": len(self.running),
+            "completed": self.completed,
+            "failed": self.failed,
+            "jobs_per_minute": round(len(self.finished_times) * 60 / window, 2),
+            "latency_seconds": _percentiles([r["latency"] for r in self.recent]),
+            "compare_seconds": _percentiles(
+                [float(r["seconds"]) for r in self.recent if r.get("seconds")]
+            ),
+            "recent": [
+                {key: row.get(key) for key in ("name", "status", "discrepancies")}
+                for row in list(self.recent)[-10:]
+            ],
+        }
+
+    def _write_status(self, watching: bool, force: bool = False) -> None:
+        """Replace the status file, at most once per STATUS_INTERVAL."""
+        if not force and time.time() - self._status_written < STATUS_INTERVAL:
+            return
+        self._status_written = time.time()
+        partial = self.status_path.with_name(self.status_path.name + ".part")
+        try:
+            with open(partial, "w", encoding="utf-8") as f:
+                json.dump(self.status(watching), f, ensure_ascii=False, indent=2)
+            os.replace(partial, self.status_path)
+        except OSError:
+            logging.exception("Failed to write %s", self.status_path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the daemon, returning the process exit code."""
+    parser = argparse.ArgumentParser(
+        prog="python -m daemon",
+        description="Compare acts dropped into the folders in watch.folders.",
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="compare the files already there, then exit",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="log progress")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+    daemon = WatchDaemon(load_config())
+    signal.signal(signal.SIGINT, daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    try:
+        daemon.run(once=args.once)
+    except (FileNotFoundError, ValueError, OSError) as e:
+        logging.exception("Daemon failed")
+        print(f"ERROR {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""Chunked exporters for discrepancy reports.
+
+Reports are written in slices of ``CHUNK_ROWS`` rows so progress can be
+reported and the export cancelled between slices. Output goes to a temporary
+``.part`` file that replaces the target only when writing succeeds. The
+module has no GUI dependencies and is shared by the GUI, the CLI and other
+headless callers.
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Optional
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+
+from logic import AMOUNT_COLUMNS, CancelToken, format_amount
+
+CHUNK_ROWS = 50000
+
+# Excel sheets hold at most 1,048,576 rows including the header
+XLSX_MAX_ROWS = 1_048_575
+
+EXPORT_FORMATS = {
+    ".txt": "txt",
+    ".tsv": "txt",
+    ".csv": "csv",
+    ".xlsx": "xlsx",
+    ".parquet": "parquet",
+}
+
+
+def export_format(path: Path) -> str:
+    """Return the export format for a file name, based on its extension."""
+    try:
+        return EXPORT_FORMATS[Path(path).suffix.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Unsupported report format: {Path(path).suffix or path}"
+        ) from None
+
+
+def export_discrepancies(
+    diffs: pd.DataFrame,
+    path: Path,
+    progress: Optional[Callable[[float], None]] = None,
+    cancel: Optional[CancelToken] = None,
+) -> None:
+    """Write discrepancies to path in the format given by its extension.
+
+    Args:
+        diffs: Result of ``ExcelProcessor.find_discrepancies``
+        path: Target file (.txt/.tsv, .csv, .xlsx or .parquet)
+        progress: Optional callback receiving the fraction of rows written
+        cancel: Optional token; a cancelled export leaves no file behind
+
+    Raises:
+        OperationCancelled: If the token was cancelled during the export
+        ValueError: If the format is unknown or its library is missing
+    """
+    path = Path(path)
+    writer = _WRITERS[export_format(path)]
+    partial = path.with_name(path.name + ".part")
+    try:
+        writer(diffs, partial, _Progress(len(diffs), progress, cancel))
+        os.replace(partial, path)
+    finally:
+        if partial.exists():
+            partial.unlink()
+    logging.info("Exported %s discrepancies to %s", len(diffs), path)
+
+
+class _Progress:
+    """Checks for cancellation and reports progress between chunks."""
+
+    def __init__(self, total, callback, cancel):
+        self.total = total
+        self.callback = callback
+        self.cancel = cancel
+
+    def __call__(self, written: int) -> None:
+        if self.cancel is not None:
+            self.cancel.check()
+        if self.callback:
+            self.callback(written / self.total if self.total else 1.0)
+
+
+def _chunks(diffs: pd.DataFrame, step: int = CHUNK_ROWS):
+    for start in range(0, len(diffs), step):
+        yield start + min(step, len(diffs) - start), diffs.iloc[start : start + step]
+
+
+def _write_txt(diffs: pd.DataFrame, path: Path, progress: _Progress) -> None:
+    """Tab-separated text with thousands separators, as shown in the GUI."""
+    amount_cols = [c for c in diffs.columns if c in AMOUNT_COLUMNS]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("\t".join(map(str, diffs.columns)) + "\n")
+        progress(0)
+        for written, chunk in _chunks(diffs):
+            chunk = chunk.assign(
+                **{col: chunk[col].map(format_amount) for col in amount_cols}
+            )
+            chunk.to_csv(f, sep="\t", header=False, index=False, lineterminator="\n")
+            progress(written)
+
+
+def _write_csv(diffs: pd.DataFrame, path: Path, progress: _Progress) -> None:
+    """Comma-separated values with plain numbers; the BOM lets Excel detect UTF-8."""
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        f.write(",".join(map(str, diffs.columns)) + "\n")
+        progress(0)
+        for written, chunk in _chunks(diffs):
+            chunk.to_csv(
+                f, header=False, index=False, float_format="%.2f", lineterminator="\n"
+            )
+            progress(written)
+
+
+def _write_xlsx(diffs: pd.DataFrame, path: Path, progress: _Progress) -> None:
+    """Excel workbook streamed through openpyxl's constant-memory writer.
+
+    Amounts are numeric cells with a thousands format; results longer than
+    one sheet continue on further sheets.
+    """
+    wb = Workbook(write_only=True)
+    columns = [str(c) for c in diffs.columns]
+    is_amount = [c in AMOUNT_COLUMNS for c in columns]
+    sheet, sheet_rows = None, XLSX_MAX_ROWS
+    progress(0)
+    for written, chunk in _chunks(diffs):
+        for values in chunk.itertuples(index=False, name=None):
+            if sheet_rows >= XLSX_MAX_ROWS:
+                sheet = wb.create_sheet(f"Discrepancies {len(wb.worksheets) + 1}")
+                sheet.append(columns)
+                sheet_rows = 0
+            row = []
+            for value, amount in zip(values, is_amount):
+                if amount and pd.notna(value):
+                    value = WriteOnlyCell(sheet, value=float(value))
+                    value.number_format = "#,##0.00"
+                elif amount:
+                    value = None  # A missing amount stays an empty cell
+                row.append(value)
+            sheet.append(row)
+            sheet_rows += 1
+        progress(written)
+    if sheet is None:
+        wb.create_sheet("Discrepancies 1").append(columns)
+    wb.save(path)
+
+
+def _write_parquet(diffs: pd.DataFrame, path: Path, progress: _Progress) -> None:
+    """Parquet file written one row group per chunk (requires pyarrow)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet export requires the pyarrow package") from None
+
+    frame = diffs.reset_index(drop=True)
+    # The schema is taken from data, as empty object columns carry no type
+    schema = pa.Table.from_pandas(frame.head(CHUNK_ROWS), preserve_index=False).schema
+    with pq.ParquetWriter(path, schema) as writer:
+        progress(0)
+        for written, chunk in _chunks(frame):
+            writer.write_table(
+                pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            )
+            progress(written)
+
+
+_WRITERS = {
+    "txt": _write_txt,
+    "csv": _write_csv,
+    "xlsx": _write_xlsx,
+    "parquet": _write_parquet,
+}
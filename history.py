@@ -0,0 +1,240 @@
+"""History of comparison runs kept in a local SQLite database.
+
+Every saved run records its input files with a digest of their content, the
+settings that shape the result and all of its discrepancies. Amounts are
+stored as exact minor units and discrepancies are keyed by (run, ID), so a
+past run is read back by one index range scan without re-parsing the original
+files, and two runs are diffed by joins on that key.
+"""
+
+import json
+import logging
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from logic import MINOR_UNITS, get_parse_cache, to_minor_units
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    discrepancies INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS inputs (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    side TEXT NOT NULL,
+    path TEXT NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS inputs_run ON inputs (run_id);
+CREATE INDEX IF NOT EXISTS inputs_digest ON inputs (digest);
+CREATE TABLE IF NOT EXISTS discrepancies (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    id TEXT NOT NULL,
+    registry INTEGER NOT NULL,
+    act INTEGER NOT NULL,
+    PRIMARY KEY (run_id, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS discrepancies_id ON discrepancies (id);
+"""
+
+# Configuration keys saved with each run
+RUN_SETTINGS = (
+    "epsilon",
+    "duplicates",
+    "id_columns",
+    "amount_columns",
+    "skip_rows",
+    "id_normalization",
+)
+
+RUN_COLUMNS = ["Run", "Created", "Registry", "Act", "Discrepancies"]
+CHANGE_COLUMNS = ["ID", "Status", "Registry", "Act", "Diff", "Previous Diff"]
+
+# Discrepancies found only in the newer run, only in the older run, and in
+# both with different amounts; amounts are those of the newer run
+CHANGES_QUERY = """
+SELECT new.id, 'new', new.registry, new.act, NULL
+FROM discrepancies AS new
+WHERE new.run_id = :new AND NOT EXISTS (
+    SELECT 1 FROM discrepancies AS old WHERE old.run_id = :old AND old.id = new.id
+)
+UNION ALL
+SELECT old.id, 'resolved', NULL, NULL, old.registry - old.act
+FROM discrepancies AS old
+WHERE old.run_id = :old AND NOT EXISTS (
+    SELECT 1 FROM discrepancies AS new WHERE new.run_id = :new AND new.id = old.id
+)
+UNION ALL
+SELECT new.id, 'changed', new.registry, new.act, old.registry - old.act
+FROM discrepancies AS new
+JOIN discrepancies AS old ON old.run_id = :old AND old.id = new.id
+WHERE new.run_id = :new AND (new.registry != old.registry OR new.act != old.act)
+ORDER BY 1
+"""
+
+
+class RunHistory:
+    """Saves comparison runs to an SQLite file and reads them back.
+
+    A connection is opened per call, so one instance may be used from any
+    thread, and several processes may write to the same file.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute("PRAGMA foreign_keys = ON")
+        connection.executescript(SCHEMA)
+        return connection
+
+    def save_run(
+        self,
+        diffs: pd.DataFrame,
+        registry_paths: List[Path],
+        act_paths: List[Path],
+        config: Dict,
+    ) -> int:
+        """Save a comparison result with its inputs and settings.
+
+        Args:
+            diffs: Result of ``ExcelProcessor.find_discrepancies``
+            registry_paths: Registry files of the comparison
+            act_paths: Act files of the comparison
+            config: Configuration the comparison ran with
+
+        Returns:
+            The number of the new run
+        """
+        # The parse cache already hashed the inputs while loading them
+        cache = get_parse_cache(config)
+        inputs = [
+            (side, str(Path(path).resolve()), cache.digest(path))
+            for side, paths in (("registry", registry_paths), ("act", act_paths))
+            for path in paths
+        ]
+        settings = json.dumps({key: config[key] for key in RUN_SETTINGS})
+        rows = zip(
+            diffs["ID"].astype(str).tolist(),
+            to_minor_units(diffs["Registry"]).tolist(),
+            to_minor_units(diffs["Act"]).tolist(),
+        )
+        with closing(self._connect()) as connection, connection:
+            run_id = connection.execute(
+                "INSERT INTO runs (created, settings, discrepancies) VALUES (?, ?, ?)",
+                (datetime.now().isoformat(timespec="seconds"), settings, len(diffs)),
+            ).lastrowid
+            connection.executemany(
+                "INSERT INTO inputs (run_id, side, path, digest) VALUES (?, ?, ?, ?)",
+                [(run_id,) + entry for entry in inputs],
+            )
+            connection.executemany(
+                "INSERT INTO discrepancies (run_id, id, registry, act) "
+                "VALUES (?, ?, ?, ?)",
+                ((run_id,) + row for row in rows),
+            )
+        logging.info("Saved run %s with %s discrepancies", run_id, len(diffs))
+        return run_id
+
+    def runs(self) -> pd.DataFrame:
+        """List saved runs, newest first, with the names of their files."""
+        with closing(self._connect()) as connection:
+            runs = connection.execute(
+                "SELECT id, created, discrepancies FROM runs ORDER BY id DESC"
+            ).fetchall()
+            inputs = connection.execute(
+                "SELECT run_id, side, path FROM inputs ORDER BY rowid"
+            ).fetchall()
+        names = {}
+        for run_id, side, path in inputs:
+            names.setdefault((run_id, side), []).append(Path(path).name)
+        return pd.DataFrame(
+            [
+                (
+                    run_id,
+                    created,
+                    ", ".join(names.get((run_id, "registry"), [])),
+                    ", ".join(names.get((run_id, "act"), [])),
+                    count,
+                )
+                for run_id, created, count in runs
+            ],
+            columns=RUN_COLUMNS,
+        )
+
+    def load_run(self, run_id: int) -> pd.DataFrame:
+        """Return the discrepancies of a saved run, as the comparison found them.
+
+        Raises:
+            ValueError: If there is no such run
+        """
+        with closing(self._connect()) as connection:
+            if not connection.execute(
+                "SELECT 1 FROM runs WHERE id = ?", (run_id,)
+            ).fetchone():
+                raise ValueError(f"Run {run_id} not found in history")
+            rows = connection.execute(
+                "SELECT id, registry, act FROM discrepancies WHERE run_id = ? "
+                "ORDER BY id",
+                (run_id,),
+            ).fetchall()
+        # Rows come ordered by ID text, as discrepancy_frame orders them
+        frame = pd.DataFrame(rows, columns=["ID", "Registry", "Act"])
+        units = frame[["Registry", "Act"]].to_numpy(dtype=np.int64)
+        frame["Registry"] = units[:, 0] / MINOR_UNITS
+        frame["Act"] = units[:, 1] / MINOR_UNITS
+        frame["Diff"] = (units[:, 0] - units[:, 1]) / MINOR_UNITS
+        return frame.astype({"ID": object})
+
+    def diff_runs(self, old: int, new: int) -> pd.DataFrame:
+        """Compare the discrepancies of two runs.
+
+        Returns:
+            Frame with ``CHANGE_COLUMNS`` ordered by ID. Status is ``new``
+            (only in the newer run), ``resolved`` (only in the older run) or
+            ``changed`` (different amounts); Registry, Act and Diff are those
+            of the newer run and Previous Diff that of the older run.
+
+        Raises:
+            ValueError: If either run does not exist
+        """
+        with closing(self._connect()) as connection:
+            for run_id in (old, new):
+                if not connection.execute(
+                    "SELECT 1 FROM runs WHERE id = ?", (run_id,)
+                ).fetchone():
+                    raise ValueError(f"Run {run_id} not found in history")
+            rows = connection.execute(
+                CHANGES_QUERY, {"old": old, "new": new}
+            ).fetchall()
+        frame = pd.DataFrame(
+            rows, columns=["ID", "Status", "Registry", "Act", "Previous Diff"]
+        )
+        for column in ("Registry", "Act", "Previous Diff"):
+            frame[column] = frame[column].astype(np.float64) / MINOR_UNITS
+        frame["Diff"] = frame["Registry"] - frame["Act"]
+        return frame[CHANGE_COLUMNS]
+
+
+def open_history(config: Dict) -> Optional[RunHistory]:
+    """Return the run history named in the configuration, or None if disabled.
+
+    A relative ``history.path`` is resolved against the user's home directory,
+    like the log file.
+    """
+    settings = config["history"]
+    if not settings["enabled"]:
+        return None
+    return RunHistory(Path.home() / settings["path"])
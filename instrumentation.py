@@ -0,0 +1,188 @@
+"""Per-stage timing and memory instrumentation for the comparison pipeline.
+
+A ``StageRecorder`` collects one record per pipeline stage (header detection,
+reading, preprocessing, merge, display) with its wall time, rows processed and
+peak memory; a ``StartupTimer`` does the same for application startup.
+Records are plain dictionaries so they can be sent between processes, emitted
+through Qt signals and written as JSON lines.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Interval between resident memory samples taken during a stage
+RSS_SAMPLE_SECONDS = 0.01
+
+
+def current_rss() -> int:
+    """Return the resident set size of this process in bytes (0 if unknown)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+
+        # High-water mark only: kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return 0
+
+
+class _RssSampler:
+    """Track the peak resident memory while a stage runs."""
+
+    def __init__(self):
+        self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(RSS_SAMPLE_SECONDS):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self) -> "_RssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+class StageRecorder:
+    """Record wall time, rows and memory for each stage of a run.
+
+    Args:
+        trace_allocations: Also trace Python allocations with ``tracemalloc``,
+            which gives exact allocated bytes but slows the stage down
+    """
+
+    def __init__(self, trace_allocations: bool = False):
+        self.trace_allocations = trace_allocations
+        self.records: List[Dict] = []
+
+    @contextmanager
+    def stage(self, name: str, **fields) -> Iterator[Dict]:
+        """Measure the enclosed block as one stage.
+
+        The yielded record may be updated inside the block, typically with the
+        ``rows`` processed. Stages that raise are not recorded.
+        """
+        record = {"stage": name, "rows": 0, **fields}
+        started_tracing = self.trace_allocations and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        elif self.trace_allocations:
+            tracemalloc.reset_peak()
+        base_alloc = tracemalloc.get_traced_memory()[0] if self.trace_allocations else 0
+
+        try:
+            with _RssSampler() as rss:
+                started = time.perf_counter()
+                yield record
+                seconds = time.perf_counter() - started
+            if self.trace_allocations:
+                peak_alloc = tracemalloc.get_traced_memory()[1] - base_alloc
+                record["alloc_peak_mb"] = round(peak_alloc / 1024 / 1024, 2)
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+        record["seconds"] = round(seconds, 4)
+        record["peak_rss_mb"] = round(rss.peak / 1024 / 1024, 1)
+        record["pid"] = os.getpid()
+        self.records.append(record)
+
+
+class StartupTimer:
+    """Record how long the application took to reach each point of startup.
+
+    Times are measured from the creation of the timer, which should happen as
+    early as possible. Records have the same shape as stage records, with
+    ``seconds`` counted from the start rather than from the previous mark.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.records: List[Dict] = []
+
+    def mark(self, name: str) -> None:
+        """Record that startup reached ``name``."""
+        seconds = time.perf_counter() - self.started
+        self.records.append({"stage": name, "rows": 0, "seconds": round(seconds, 4)})
+
+    def summary(self) -> str:
+        """Return the marks as one line for the log."""
+        return ", ".join(f"{r['stage']} {r['seconds']:.3f} s" for r in self.records)
+
+
+def metrics_path(log_path: Path) -> Path:
+    """Return the JSON lines file kept next to the application log."""
+    return Path(log_path).with_suffix(".metrics.jsonl")
+
+
+def write_metrics(path: Path, run_id: str, records: List[Dict]) -> None:
+    """Append one JSON line per stage record, tagged with the run."""
+    timestamp = datetime.now().isoformat(timespec="seconds")
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            for record in records:
+                line = {"run": run_id, "time": timestamp, **record}
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+    except OSError:
+        logging.exception("Could not write metrics to %s", path)
+
+
+@contextmanager
+def profile_run(path_stem: Path) -> Iterator[Dict]:
+    """Profile the enclosed block and write the result next to ``path_stem``.
+
+    pyinstrument's sampling profiler is used when installed (HTML report),
+    otherwise cProfile (``.prof`` file for pstats or snakeviz). The yielded
+    dictionary receives the ``path`` of the written report.
+    """
+    result: Dict[str, Optional[Path]] = {"path": None}
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield result
+        finally:
+            profiler.disable()
+            result["path"] = Path(f"{path_stem}.prof")
+            profiler.dump_stats(str(result["path"]))
+            logging.info("Profile written to %s", result["path"])
+    else:
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield result
+        finally:
+            profiler.stop()
+            result["path"] = Path(f"{path_stem}.html")
+            result["path"].write_text(profiler.output_html(), encoding="utf-8")
+            logging.info("Profile written to %s", result["path"])
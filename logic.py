@@ -1,27 +1,689 @@
 """Business logic for Excel file processing and discrepancy detection."""
 
+import codecs
+import csv
+import hashlib
+import importlib.util
+import io
 import json
 import logging
+import multiprocessing
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from contextlib import nullcontext
+from fnmatch import fnmatchcase
+from functools import cached_property, lru_cache
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from itertools import chain, islice
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
 
+import numpy as np
 import pandas as pd
-import yaml
+from openpyxl import load_workbook
+from openpyxl.cell.cell import ERROR_CODES
+from openpyxl.utils.exceptions import InvalidFileException
+from pandas.io.parsers import TextParser
 
+from instrumentation import StageRecorder
+from matching import normalization_enabled, normalize_ids
+from resources import load_config, load_translation
 
-def load_config() -> Dict:
-    """Load application configuration from config.yaml."""
-    config_path = Path(__file__).parent / "config.yaml"
-    with open(config_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+
+def _convert_cell(value):
+    """Convert a raw openpyxl cell value the same way pandas' reader does."""
+    if value is None:
+        return ""
+    if isinstance(value, str) and value in ERROR_CODES:
+        return float("nan")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        as_int = int(value)
+        return as_int if as_int == value else float(value)
+    return value
+
+
+# Columns holding money, formatted as amounts in the table and reports
+AMOUNT_COLUMNS = (
+    "Registry",
+    "Act",
+    "Diff",
+    "Previous Diff",
+    "Registry total",
+    "Act total",
+)
+
+
+def format_amount(value) -> str:
+    """Format an amount with thousands separators and two decimals; a missing
+    amount (NaN or None) is an empty string."""
+    if value is None or value != value:
+        return ""
+    return f"{value:,.2f}"
+
+
+# Amounts are compared as whole minor units (kopecks, cents)
+MINOR_UNITS = 100
+
+# Powers of ten for counting the digits of int64 keys
+_POWERS_OF_TEN = 10 ** np.arange(19, dtype=np.int64)
+
+
+class EncodedIds(NamedTuple):
+    """ID columns of several frames encoded as comparable int64 keys."""
+
+    keys: List[np.ndarray]  # One key array per encoded column
+    labels: Optional[np.ndarray]  # ID text per key; None if keys are the IDs
+
+
+def _as_int_keys(column: pd.Series) -> Optional[np.ndarray]:
+    """Return the column as int64 keys if every ID is written as a plain int.
+
+    Only text for which ``str(int(text)) == text`` qualifies, so "00123" and
+    "123" stay different IDs, as they are when compared as text.
+    """
+    if pd.api.types.is_integer_dtype(column.dtype):
+        return column.to_numpy(dtype=np.int64)
+    if not (
+        pd.api.types.is_object_dtype(column.dtype)
+        or pd.api.types.is_string_dtype(column.dtype)
+    ):
+        return None
+    text = column.astype(str).to_numpy(dtype=object)
+    # int() also accepts non-ASCII digits, which str() never produces
+    if not "".join(text).isascii():
+        return None
+    try:
+        keys = text.astype(np.int64)
+    except (ValueError, OverflowError):
+        return None
+    # Signs, spaces, underscores and leading zeros make the text longer than
+    # the digits of its value
+    digits = np.maximum(np.searchsorted(_POWERS_OF_TEN, np.abs(keys), "right"), 1)
+    lengths = np.fromiter(map(len, text), dtype=np.int64, count=len(text))
+    if not np.array_equal(lengths, digits + (keys < 0)):
+        return None
+    return keys
+
+
+def encode_ids(columns: List[pd.Series]) -> EncodedIds:
+    """Encode ID columns so equal IDs get equal int64 keys across all columns.
+
+    IDs are compared by their text, as ``astype(str)`` would render them.
+    When all IDs are plain integers they are used as keys directly; otherwise
+    the text of all columns is factorized into one shared dictionary.
+    """
+    keys = []
+    for column in columns:
+        as_int = _as_int_keys(column)
+        if as_int is None:
+            break
+        keys.append(as_int)
+    else:
+        return EncodedIds(keys, None)
+
+    texts = [column.astype(str).to_numpy(dtype=object) for column in columns]
+    codes, labels = pd.factorize(np.concatenate(texts))
+    bounds = np.cumsum([0] + [len(text) for text in texts])
+    keys = [codes[start:end].astype(np.int64) for start, end in zip(bounds, bounds[1:])]
+    return EncodedIds(keys, np.asarray(labels, dtype=object))
+
+
+def decode_ids(keys: np.ndarray, labels: Optional[np.ndarray]) -> np.ndarray:
+    """Return the ID text of encoded keys."""
+    if labels is None:
+        return keys.astype(str).astype(object)
+    return labels[keys]
+
+
+def to_minor_units(amounts: pd.Series) -> np.ndarray:
+    """Convert amounts to exact int64 minor units, rounding to the nearest unit."""
+    values = pd.to_numeric(amounts, errors="coerce").to_numpy(dtype=np.float64)
+    return np.rint(np.nan_to_num(values) * MINOR_UNITS).astype(np.int64)
+
+
+# How rows sharing an ID are combined (``duplicates`` in config.yaml)
+DUPLICATE_POLICIES = ("first", "sum", "error")
+
+
+# Repeated IDs listed by name in the log; the full list is logged at DEBUG
+DUPLICATE_LOG_SAMPLE = 10
+
+
+class DuplicateRows(dict):
+    """Number of rows per repeated ID text, kept in ``attrs["duplicate_rows"]``.
+
+    pandas deep-copies ``attrs`` into every frame and column derived from a
+    frame; the counts are never modified after creation, so copies share them.
+    """
+
+    def __deepcopy__(self, memo: Dict) -> "DuplicateRows":
+        return self
+
+
+def log_duplicates(source: str, duplicate_rows: Dict[str, int]) -> None:
+    """Log how many rows were collapsed into the repeated IDs of one input,
+    with the row count of each repeated ID."""
+    if not duplicate_rows:
+        return
+    logging.info(
+        "%s: %s rows collapsed into %s repeated IDs, e.g. %s",
+        source,
+        sum(duplicate_rows.values()) - len(duplicate_rows),
+        len(duplicate_rows),
+        ", ".join(
+            f"{id_text} ({rows} rows)"
+            for id_text, rows in islice(duplicate_rows.items(), DUPLICATE_LOG_SAMPLE)
+        ),
+    )
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        for id_text, rows in duplicate_rows.items():
+            logging.debug("%s: ID %s on %s rows", source, id_text, rows)
+
+
+# Keys spanning at most this many slots per row are joined through a direct
+# lookup table instead of sorting
+DENSE_SPAN_FACTOR = 2
+
+
+def join_keys(reg_keys: np.ndarray, act_keys: np.ndarray) -> np.ndarray:
+    """Return, for each registry key, the index of the same act key or -1.
+
+    Keys must be unique within each side. Dense keys (factorized IDs or
+    mostly consecutive order numbers) are joined through a lookup table in
+    linear time; sparse keys are sorted and matched with ``np.searchsorted``.
+
+    Raises:
+        ValueError: If a side holds the same key twice
+    """
+    if not len(reg_keys) or not len(act_keys):
+        return np.full(len(reg_keys), -1, dtype=np.int64)
+
+    low = min(reg_keys.min(), act_keys.min())
+    # Python ints: the int64 difference of far-apart keys would wrap around
+    span = int(max(reg_keys.max(), act_keys.max())) - int(low) + 1
+    if span <= DENSE_SPAN_FACTOR * (len(reg_keys) + len(act_keys)):
+        slots = []
+        for keys in (reg_keys, act_keys):
+            slot = np.full(span, -1, dtype=np.int64)
+            positions = np.arange(len(keys), dtype=np.int64)
+            slot[keys - low] = positions
+            # A repeated key leaves one of its positions unstored
+            if not np.array_equal(slot[keys - low], positions):
+                raise ValueError("IDs must be unique within each file")
+            slots.append(slot)
+        return slots[1][reg_keys - low]
+
+    reg_order = np.argsort(reg_keys, kind="stable")
+    act_order = np.argsort(act_keys, kind="stable")
+    reg_sorted, act_sorted = reg_keys[reg_order], act_keys[act_order]
+    if (reg_sorted[1:] == reg_sorted[:-1]).any() or (
+        act_sorted[1:] == act_sorted[:-1]
+    ).any():
+        raise ValueError("IDs must be unique within each file")
+    pos = np.minimum(np.searchsorted(act_sorted, reg_sorted), len(act_keys) - 1)
+    match = np.empty(len(reg_keys), dtype=np.int64)
+    match[reg_order] = np.where(act_sorted[pos] == reg_sorted, act_order[pos], -1)
+    return match
+
+
+def discrepancy_frame(
+    ids: np.ndarray, reg_units: np.ndarray, act_units: np.ndarray
+) -> pd.DataFrame:
+    """Build a result frame ordered by ID text, as a merge on text IDs orders it."""
+    frame = pd.DataFrame(
+        {
+            "ID": ids,
+            "Registry": reg_units / MINOR_UNITS,
+            "Act": act_units / MINOR_UNITS,
+            "Diff": (reg_units - act_units) / MINOR_UNITS,
+        }
+    )
+    return frame.sort_values("ID", kind="mergesort").reset_index(drop=True)
+
+
+class ComparisonResult(NamedTuple):
+    """Discrepancies split by kind, each with ID, Registry, Act and Diff columns.
+
+    One-sided frames hold every ID missing from the other file, including
+    those with amounts within epsilon; ``combined`` applies epsilon to them.
+    """
+
+    mismatched: pd.DataFrame  # IDs in both files whose amounts differ
+    only_registry: pd.DataFrame  # IDs missing from the act
+    only_act: pd.DataFrame  # IDs missing from the registry
+
+    def combined(self, epsilon: float) -> pd.DataFrame:
+        """All discrepancies larger than epsilon in one frame ordered by ID."""
+        threshold = round(epsilon * MINOR_UNITS, 6)
+        frames = [self.mismatched] + [
+            frame.loc[np.abs(to_minor_units(frame["Diff"])) > threshold]
+            for frame in (self.only_registry, self.only_act)
+        ]
+        frames = [frame for frame in frames if len(frame)] or [self.mismatched]
+        return (
+            pd.concat(frames, ignore_index=True)
+            .sort_values("ID", kind="mergesort")
+            .reset_index(drop=True)
+        )
+
+
+class IndexedIds:
+    """IDs and amounts of one cleaned side, indexed for repeated lookups.
+
+    The ID text, amounts in minor units and the hash index over the IDs are
+    built on first use and then kept, so a side that is compared again (a
+    registry against several acts, or an unchanged side of a re-comparison)
+    is not encoded twice. IDs must be unique, as the duplicate policy leaves
+    them.
+    """
+
+    def __init__(self, entry: Tuple[pd.DataFrame, str, str]):
+        self.entry = entry
+
+    @cached_property
+    def ids(self) -> np.ndarray:
+        """ID text of every row, as the comparison matches IDs."""
+        df, id_col, _ = self.entry
+        return df[id_col].astype(str).to_numpy(dtype=object)
+
+    @cached_property
+    def units(self) -> np.ndarray:
+        """Amounts in exact minor units."""
+        df, _, amt_col = self.entry
+        return to_minor_units(df[amt_col])
+
+    @cached_property
+    def index(self) -> pd.Index:
+        """Hash index of the IDs."""
+        return pd.Index(self.ids)
+
+    def positions(self, ids: np.ndarray) -> np.ndarray:
+        """Return the row of each given ID, or -1 where it is missing."""
+        return self.index.get_indexer(ids)
+
+    def units_at(self, positions: np.ndarray) -> np.ndarray:
+        """Return the amounts at the given rows in minor units, 0 for -1."""
+        if not len(self.units):
+            return np.zeros(len(positions), dtype=np.int64)
+        return np.where(positions >= 0, self.units[positions], 0)
+
+    def lookup(self, ids: np.ndarray) -> np.ndarray:
+        """Return the amounts of the given IDs in minor units, 0 where missing."""
+        return self.units_at(self.positions(ids))
+
+
+class OperationCancelled(Exception):
+    """Raised when a long-running operation is stopped through a CancelToken."""
+
+
+class CancelToken:
+    """Thread-safe flag for stopping long-running operations cooperatively.
+
+    Long operations call ``check()`` at checkpoints between chunks of work.
+    ``event`` may be any object with ``set()`` and ``is_set()``, such as a
+    multiprocessing manager event shared with worker processes.
+    """
+
+    def __init__(self, event=None):
+        self._event = event if event is not None else threading.Event()
+
+    def cancel(self) -> None:
+        """Request cancellation."""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self) -> None:
+        """Raise OperationCancelled if cancellation was requested."""
+        if self._event.is_set():
+            raise OperationCancelled()
+
+
+def user_cache_dir() -> Path:
+    """Return the per-user cache directory for the current platform."""
+    if sys.platform == "win32":
+        base = Path(os.environ.get("LOCALAPPDATA", Path.home() / "AppData" / "Local"))
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    return base / "discrepancy-finder"
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Return the BLAKE2b hex digest of a file's content."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """LRU cache of cleaned (ID, amount) frames keyed by file identity and content.
+
+    Entries are kept in memory and, optionally, persisted as Parquet files so
+    that parsed workbooks survive application restarts.
+    """
+
+    def __init__(self, max_entries: int = 8, disk_dir: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries: OrderedDict = OrderedDict()
+        self._digests: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def make_key(
+        self, path: Path, fingerprint: str, sheet: Optional[str] = None
+    ) -> Tuple[str, int, int, str, str, Optional[str]]:
+        """Build a cache key from path, mtime, size, content hash, settings and
+        the sheet read (None for the first one)."""
+        path = Path(path).resolve()
+        stat = path.stat()
+        return (
+            str(path),
+            stat.st_mtime_ns,
+            stat.st_size,
+            self.digest(path),
+            fingerprint,
+            sheet,
+        )
+
+    def digest(self, path: Path) -> str:
+        """Return the content digest of a file, hashing it only when its
+        modification time or size changed since the last call."""
+        path = Path(path).resolve()
+        stat = path.stat()
+        with self._lock:
+            known = self._digests.get(str(path))
+        if known is not None and known[:2] == (stat.st_mtime_ns, stat.st_size):
+            return known[2]
+        digest = file_digest(path)
+        with self._lock:
+            self._digests[str(path)] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def get(self, key: Tuple) -> Optional[Tuple[pd.DataFrame, str, str]]:
+        """Return the cached entry for key, consulting the disk cache on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key: Tuple, entry: Tuple[pd.DataFrame, str, str]) -> None:
+        """Store an entry in memory and, if enabled, on disk."""
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def clear(self) -> None:
+        """Drop all in-memory entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key: Tuple, entry: Tuple[pd.DataFrame, str, str]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _disk_path(self, key: Tuple) -> Optional[Path]:
+        if self.disk_dir is None:
+            return None
+        # Content hash and settings only: copies and moved files share an entry
+        name = hashlib.blake2b(
+            f"{key[3]}:{key[4]}:{key[5]}".encode(), digest_size=20
+        ).hexdigest()
+        return self.disk_dir / f"{name}.parquet"
+
+    def _read_disk(self, key: Tuple) -> Optional[Tuple[pd.DataFrame, str, str]]:
+        target = self._disk_path(key)
+        if target is None or not target.exists():
+            return None
+        try:
+            df = pd.read_parquet(target)
+        except (ImportError, OSError, ValueError):
+            logging.warning("Ignoring unreadable cache file %s", target)
+            return None
+        return df, df.columns[0], df.columns[1]
+
+    def _write_disk(self, key: Tuple, entry: Tuple[pd.DataFrame, str, str]) -> None:
+        target = self._disk_path(key)
+        if target is None:
+            return
+        df, id_col, amt_col = entry
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            # IDs are compared as strings, so store them as such for Parquet
+            stored = df.astype({id_col: str})
+            # pandas would write attrs as JSON metadata of every file
+            stored.attrs = {}
+            stored.to_parquet(target, index=False)
+        except ImportError:
+            logging.warning("pyarrow is not installed, disk cache disabled")
+            self.disk_dir = None
+        except (OSError, ValueError):
+            logging.exception("Failed to write cache file %s", target)
+
+
+_parse_cache: Optional[ParseCache] = None
+_parse_cache_lock = threading.Lock()
+
+
+def get_parse_cache(config: Dict) -> ParseCache:
+    """Return the process-wide parse cache, creating it from config on first use."""
+    global _parse_cache
+    with _parse_cache_lock:
+        if _parse_cache is None:
+            settings = config["cache"]
+            disk_dir = None
+            if settings["disk"]:
+                disk_dir = (
+                    Path(settings["dir"]) if settings["dir"] else user_cache_dir()
+                )
+            _parse_cache = ParseCache(settings["max_entries"], disk_dir)
+        return _parse_cache
+
+
+class HeaderMatch(NamedTuple):
+    """Header row and key column positions found in the first rows of a sheet."""
+
+    row: int
+    id_col: Optional[int]
+    amount_col: Optional[int]
+
+
+# Rows read between two progress reports while streaming a sheet
+PROGRESS_ROWS = 2000
+
+# Delimited text exports handled by the CSV reader instead of an Excel engine
+CSV_SUFFIXES = (".csv", ".tsv")
+
+# Rows read per chunk when loading a CSV file whole
+CSV_CHUNK_ROWS = 100000
+
+# Bytes per block of pyarrow's CSV reader; blocks are parsed on separate threads
+ARROW_BLOCK_BYTES = 1 << 22
+
+# pyarrow decodes UTF-8 natively; other encodings are transcoded first
+ARROW_UTF8_ENCODINGS = ("utf-8", "utf-8-sig")
+
+# Cells pandas' CSV reader treats as missing, so both CSV readers agree
+CSV_NULL_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+
+# Columnar files read with pyarrow; their column names are the header
+COLUMNAR_SUFFIXES = (".parquet", ".feather", ".arrow")
+
+# Excel engines, fastest first: the package each needs and the file types it
+# reads. With ``excel.engine: auto`` the first installed one for a file is used.
+EXCEL_ENGINES = {
+    "calamine": ("python_calamine", (".xlsx", ".xlsm", ".xlsb", ".xls", ".ods")),
+    "openpyxl": ("openpyxl", (".xlsx", ".xlsm")),
+    "xlrd": ("xlrd", (".xls",)),
+}
+
+
+@lru_cache(maxsize=None)
+def installed_excel_engines() -> Tuple[str, ...]:
+    """Return the Excel engines whose package is installed, fastest first."""
+    return tuple(
+        name
+        for name, (module, _) in EXCEL_ENGINES.items()
+        if importlib.util.find_spec(module) is not None
+    )
+
+
+def source_name(path: Path, sheet: Optional[str] = None) -> str:
+    """Name a file, or one sheet of a workbook, in logs and stage records."""
+    name = Path(path).name
+    return name if sheet is None else f"{name} [{sheet}]"
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_progress_queue = None
+_process_manager = None
+_process_pool_lock = threading.Lock()
+_worker_progress_queue = None
+
+
+def _init_worker(progress_queue) -> None:
+    """Remember the progress queue inside a loader worker process."""
+    global _worker_progress_queue
+    _worker_progress_queue = progress_queue
+
+
+def _load_clean_in_worker(
+    config: Dict,
+    path: Path,
+    job: str,
+    index: int,
+    cancel_event=None,
+    instrument: Optional[bool] = None,
+    sheet: Optional[str] = None,
+) -> Tuple[Tuple[pd.DataFrame, str, str], List[Dict]]:
+    """Parse one file or sheet in a worker process, reporting progress to the
+    parent.
+
+    Returns the loaded entry and the worker's stage records. ``instrument``
+    is None when stages are not recorded, otherwise whether to trace
+    allocations.
+    """
+
+    def report(fraction: float) -> None:
+        _worker_progress_queue.put((job, index, fraction))
+
+    processor = ExcelProcessor(config)
+    if instrument is not None:
+        processor.recorder = StageRecorder(instrument)
+    cancel = CancelToken(cancel_event) if cancel_event is not None else None
+    entry = processor._load_clean_uncached(path, report, cancel, sheet)
+    return entry, processor.recorder.records if processor.recorder else []
+
+
+def worker_count(configured: int) -> int:
+    """Resolve a configured worker count, where 0 means one per CPU core."""
+    return configured if configured > 0 else os.cpu_count() or 1
+
+
+def get_process_pool(workers: int):
+    """Return the shared loader process pool and its progress queue.
+
+    The pool is created on first use and kept warm, so later comparisons do
+    not pay for starting interpreters and importing pandas again.
+    """
+    global _process_pool, _progress_queue
+    with _process_pool_lock:
+        if _process_pool is None:
+            ctx = multiprocessing.get_context("spawn")
+            _progress_queue = ctx.Queue()
+            _process_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(_progress_queue,),
+            )
+        return _process_pool, _progress_queue
+
+
+def get_process_manager():
+    """Return the manager providing cancel events shared with loader workers.
+
+    Synchronization primitives cannot be sent along with pool tasks, so
+    per-job events are proxies served by a manager process started on first use.
+    """
+    global _process_manager
+    with _process_pool_lock:
+        if _process_manager is None:
+            _process_manager = multiprocessing.get_context("spawn").Manager()
+        return _process_manager
+
+
+def shutdown_process_pool() -> None:
+    """Stop the shared loader process pool, if it was started."""
+    global _process_pool, _progress_queue, _process_manager
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+        if _process_manager is not None:
+            _process_manager.shutdown()
+        _process_pool = None
+        _progress_queue = None
+        _process_manager = None
 
 
 class ExcelProcessor:
     """Handles Excel file processing and comparison logic."""
 
-    def __init__(self):
-        self.config = load_config()
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = config if config is not None else load_config()
         self.tr = {}  # Store translations
+        self.recorder: Optional[StageRecorder] = None  # Set to record stages
+
+    def stage(self, name: str, **fields):
+        """Measure a pipeline stage if a recorder is attached.
+
+        Returns a context manager yielding the stage record, which callers
+        update with the ``rows`` processed.
+        """
+        if self.recorder is None:
+            return nullcontext({})
+        return self.recorder.stage(name, **fields)
 
     def load_translation(self, lang_code: str) -> Dict[str, str]:
         """Load language translations from i18n/[lang_code].json.
@@ -32,36 +694,165 @@ class ExcelProcessor:
         Returns:
             Dictionary with translation strings
         """
+        self.tr = load_translation(lang_code)
+        return self.tr
+
+    def _iter_sheet_rows(
+        self,
+        path: Path,
+        progress: Optional[Callable[[float], None]] = None,
+        cancel: Optional[CancelToken] = None,
+        sheet: Optional[str] = None,
+    ) -> Iterator[List]:
+        """Stream converted rows of a worksheet from a read-only workbook.
+
+        ``sheet`` names the worksheet to read; by default the first one is.
+
+        Trailing empty cells are trimmed per row; the workbook is closed when the
+        iterator is exhausted or closed. ``progress`` receives the fraction of
+        rows read, estimated from the sheet's stored dimensions, and ``cancel``
+        is checked every ``PROGRESS_ROWS`` rows.
+        """
         try:
-            i18n_path = Path(__file__).parent / "i18n" / f"{lang_code}.json"
-            with open(i18n_path, "r", encoding="utf-8") as f:
-                self.tr = json.load(f)
-                return self.tr
+            wb = load_workbook(path, read_only=True, data_only=True, keep_links=False)
         except FileNotFoundError as e:
-            logging.exception("Translation file not found")
-            raise FileNotFoundError(
-                f"Translation file for {lang_code} not found"
-            ) from e
+            logging.exception("Excel file not found")
+            raise FileNotFoundError(f"Could not find file: {path}") from e
+        except (InvalidFileException, zipfile.BadZipFile, KeyError, OSError) as e:
+            logging.exception("Error parsing Excel file")
+            raise ValueError(f"Failed to parse Excel file: {str(e)}") from e
+
+        try:
+            try:
+                ws = wb[sheet] if sheet is not None else wb.worksheets[0]
+            except KeyError as e:
+                raise ValueError(f"Sheet not found: {sheet}") from e
+            # Stored dimensions may be wrong, so they are only used for progress
+            total = ws.max_row or 0
+            ws.reset_dimensions()
+            for n, row in enumerate(ws.iter_rows(values_only=True), 1):
+                converted = [_convert_cell(v) for v in row]
+                while converted and converted[-1] == "":
+                    converted.pop()
+                yield converted
+                if n % PROGRESS_ROWS == 0:
+                    if cancel is not None:
+                        cancel.check()
+                    if progress and total:
+                        progress(min(n / total, 1.0))
+            if progress:
+                progress(1.0)
+        finally:
+            wb.close()
+
+    @staticmethod
+    def _pad_rows(rows: List[List]) -> List[List]:
+        """Trim trailing empty rows and extend all rows to the same width."""
+        last = len(rows)
+        while last and not rows[last - 1]:
+            last -= 1
+        del rows[last:]
+        if rows:
+            width = max(len(r) for r in rows)
+            for r in rows:
+                if len(r) < width:
+                    r.extend([""] * (width - len(r)))
+        return rows
+
+    @classmethod
+    def _window_frame(cls, window: List[List]) -> pd.DataFrame:
+        """Build a raw (header-less) DataFrame from buffered sheet rows."""
+        return pd.DataFrame(
+            [[None if v == "" else v for v in r] for r in cls._pad_rows(window)]
+        )
+
+    def _keyword_pattern(self) -> "re.Pattern":
+        """Compile one regex capturing the first ID and amount keyword of a text."""
+        ids = "|".join(map(re.escape, self.config["id_columns"]))
+        amounts = "|".join(map(re.escape, self.config["amount_columns"]))
+        return re.compile(
+            rf"^(?=.*?(?P<id>{ids}))?(?=.*?(?P<amount>{amounts}))?", re.DOTALL
+        )
+
+    def _match_keywords(self, texts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Flag ID and amount header cells in an array of any shape.
+
+        Cells are lower-cased once and matched against all keywords in a single
+        regex pass; a cell matching both kinds counts as an ID column.
+        """
+        cells = pd.Series(texts.ravel(), dtype=object).fillna("").astype(str)
+        found = cells.str.lower().str.extract(self._keyword_pattern())
+        is_id = found["id"].notna().to_numpy()
+        is_amount = found["amount"].notna().to_numpy() & ~is_id
+        return is_id.reshape(texts.shape), is_amount.reshape(texts.shape)
+
+    def _find_header(self, raw: pd.DataFrame) -> Optional[HeaderMatch]:
+        """Locate the header row and key columns within the first rows of a sheet."""
+        if raw.empty:
+            return None
+        is_id, is_amount = self._match_keywords(raw.to_numpy(dtype=object))
+
+        # Header is the first row with an ID column; otherwise fall back to the
+        # row with the most non-empty cells
+        id_rows = np.flatnonzero(is_id.any(axis=1))
+        if len(id_rows):
+            row = int(id_rows[0])
+        else:
+            row = int(np.argmax(raw.notna().sum(axis=1).to_numpy()))
+
+        id_cols = np.flatnonzero(is_id[row])
+        amount_cols = np.flatnonzero(is_amount[row])
+        return HeaderMatch(
+            row,
+            int(id_cols[0]) if len(id_cols) else None,
+            int(amount_cols[0]) if len(amount_cols) else None,
+        )
+
+    @staticmethod
+    def _key_columns(columns, match: HeaderMatch) -> Tuple[str, str]:
+        """Resolve the matched key column positions to parsed column names."""
+        if match.id_col is None:
+            raise ValueError(f"ID column not found. Available: {list(columns)}")
+        if match.amount_col is None:
+            raise ValueError(f"Amount column not found. Available: {list(columns)}")
+        return columns[match.id_col], columns[match.amount_col]
 
     def detect_header(self, path: Path) -> Optional[int]:
         """Detect the header row in an Excel file."""
+        match = self._detect_header_match(path)
+        return match.row if match else None
+
+    def _detect_header_match(self, path: Path) -> Optional[HeaderMatch]:
+        engine = self.excel_engine(path)
+        if engine != "openpyxl":
+            return self._detect_header_legacy(path, engine=engine)[0]
+        rows = self._iter_sheet_rows(path)
+        try:
+            window = list(islice(rows, self.config["excel"]["max_header_rows"]))
+            return self._find_header(self._window_frame(window))
+        finally:
+            rows.close()
+
+    def _detect_header_legacy(
+        self, path: Path, sheet: Optional[str] = None, engine: Optional[str] = None
+    ) -> Tuple[Optional[HeaderMatch], List]:
+        """Detect the header row through pandas for engines other than openpyxl.
+
+        ``engine`` defaults to the one ``excel_engine`` picks for the file.
+
+        Returns:
+            The match and the cells of the detected header row
+        """
         try:
             raw = pd.read_excel(
                 path,
+                sheet_name=sheet if sheet is not None else 0,
                 header=None,
                 nrows=self.config["excel"]["max_header_rows"],
-                engine=self.config["excel"]["engine"],
+                engine=engine or self.excel_engine(path),
             )
-            # Try to find header by ID column presence
-            for i, row in raw.iterrows():
-                txt = " ".join(map(str, row.fillna(""))).lower()
-                if any(k in txt for k in self.config["id_columns"]):
-                    return i
-
-            # Fallback: use row with maximum non-empty cells
-            counts = raw.notna().sum(axis=1)
-            max_rows = counts[counts == counts.max()].index
-            return int(max_rows[0]) if len(max_rows) else None
+            match = self._find_header(raw)
+            return match, raw.iloc[match.row].tolist() if match else []
 
         except FileNotFoundError as e:
             logging.exception("Excel file not found")
@@ -76,53 +867,853 @@ class ExcelProcessor:
     def get_column_names(self, df: pd.DataFrame) -> Tuple[List[str], List[str]]:
         """Find ID and amount column names in the DataFrame."""
         cols = list(df.columns)
-        id_cols = [
-            c
-            for c in cols
-            if any(k in str(c).lower() for k in self.config["id_columns"])
-        ]
-        amt_cols = [
-            c
-            for c in cols
-            if any(k in str(c).lower() for k in self.config["amount_columns"])
-            and c not in id_cols
-        ]
+        is_id, is_amount = self._match_keywords(np.array(cols, dtype=object))
+        id_cols = [c for c, hit in zip(cols, is_id) if hit]
+        amt_cols = [c for c, hit in zip(cols, is_amount) if hit]
         return id_cols, amt_cols
 
-    def load_excel(self, path: Path) -> Tuple[pd.DataFrame, str, str]:
-        """Load and preprocess Excel file, returns DataFrame and column names."""
-        header = self.detect_header(path)
-        if header is None:
+    def load_excel(
+        self,
+        path: Path,
+        progress: Optional[Callable[[float], None]] = None,
+        cancel: Optional[CancelToken] = None,
+        sheet: Optional[str] = None,
+    ) -> Tuple[pd.DataFrame, str, str]:
+        """Load a file, returning its ID and amount columns and their names.
+
+        The reader is chosen by file type: CSV, Parquet/Feather, or the Excel
+        engine from ``excel_engine``. Only the two key columns are parsed, and
+        the engine used and its time are logged. A sheet is parsed once: the
+        header is detected on the first buffered rows and the DataFrame is
+        built from the same row stream. ``sheet`` selects a worksheet by name
+        instead of the first one.
+
+        Raises:
+            OperationCancelled: If ``cancel`` is triggered while reading
+        """
+        name = source_name(path, sheet)
+        suffix = Path(path).suffix.lower()
+        started = time.perf_counter()
+        if suffix in CSV_SUFFIXES:
+            with self.stage("detect_header", file=name):
+                layout = self.csv_layout(path)
+            with self.stage("read", file=name) as record:
+                engine = "pyarrow"
+                df = self._read_csv_arrow(path, layout, progress, cancel)
+                if df is None:
+                    engine = "pandas"
+                    df = self._read_csv_whole(path, layout, progress, cancel)
+                record["engine"] = engine
+                record["rows"] = len(df)
+            id_col, amt_col = layout["id_col"], layout["amt_col"]
+        elif suffix in COLUMNAR_SUFFIXES:
+            engine = "pyarrow"
+            df, id_col, amt_col = self._read_columnar(path, progress, cancel)
+        else:
+            engine = self.excel_engine(path)
+            if engine == "openpyxl":
+                df, match = self._read_sheet(path, progress, cancel, sheet)
+            else:
+                df, match = self._read_with_pandas(
+                    path, engine, progress, cancel, sheet
+                )
+            id_col, amt_col = self._key_columns(df.columns, match)
+
+        logging.info(
+            "Read %s with %s in %.2f s", name, engine, time.perf_counter() - started
+        )
+        return df, id_col, amt_col
+
+    def excel_engine(self, path: Path) -> str:
+        """Return the engine reading a workbook: ``excel.engine`` in config.yaml,
+        or with ``auto`` the fastest installed engine for the file type.
+
+        Raises:
+            ValueError: If no installed engine reads this file type
+        """
+        configured = self.config["excel"]["engine"]
+        if configured != "auto":
+            return configured
+        suffix = Path(path).suffix.lower()
+        for engine in installed_excel_engines():
+            if suffix in EXCEL_ENGINES[engine][1]:
+                return engine
+        raise ValueError(
+            f"No installed Excel engine reads {suffix} files; "
+            "install python-calamine or xlrd"
+        )
+
+    @classmethod
+    def _key_projection(
+        cls, match: HeaderMatch, header: List
+    ) -> Tuple[List[int], HeaderMatch]:
+        """Return the positions of the key columns in file order and the match
+        remapped to a frame holding only those columns.
+
+        Raises:
+            ValueError: If the header row has no ID or amount column
+        """
+        cls._key_columns(header, match)
+        positions = sorted({match.id_col, match.amount_col})
+        return positions, match._replace(
+            id_col=positions.index(match.id_col),
+            amount_col=positions.index(match.amount_col),
+        )
+
+    def _read_with_pandas(
+        self,
+        path: Path,
+        engine: str,
+        progress: Optional[Callable[[float], None]] = None,
+        cancel: Optional[CancelToken] = None,
+        sheet: Optional[str] = None,
+    ) -> Tuple[pd.DataFrame, HeaderMatch]:
+        """Read the key columns of a sheet with ``pd.read_excel`` and ``engine``.
+
+        The sheet is parsed once without a header; the header is detected on
+        its first rows and the key columns below it are converted as
+        ``pd.read_excel`` converts them.
+        """
+        name = source_name(path, sheet)
+        with self.stage("read", file=name, engine=engine) as record:
+            try:
+                raw = pd.read_excel(
+                    path,
+                    sheet_name=sheet if sheet is not None else 0,
+                    header=None,
+                    engine=engine,
+                )
+            except FileNotFoundError as e:
+                logging.exception("Excel file not found")
+                raise FileNotFoundError(f"Could not find file: {path}") from e
+            except (pd.errors.ParserError, ValueError) as e:
+                logging.exception("Error parsing Excel file")
+                raise ValueError(f"Failed to parse Excel file: {str(e)}") from e
+            if cancel is not None:
+                cancel.check()
+            match = self._find_header(
+                raw.iloc[: self.config["excel"]["max_header_rows"]]
+            )
+            if match is None:
+                raise ValueError("Could not detect header row")
+            positions, match = self._key_projection(match, raw.iloc[match.row].tolist())
+            keys = raw.iloc[match.row :, positions].astype(object)
+            df = self._parse_rows(keys.where(keys.notna(), "").values.tolist(), 0)
+            record["rows"] = len(df)
+        if progress:
+            progress(1.0)
+        return df, match
+
+    def csv_layout(self, path: Path) -> Dict:
+        """Detect encoding, delimiter, header row and key columns of a CSV file.
+
+        Returns:
+            Dictionary with ``encoding``, ``sep``, ``decimal``, ``header``,
+            ``id_col`` and ``amt_col`` keys
+        """
+        try:
+            with open(path, "rb") as f:
+                sample = f.read(1 << 16)
+        except FileNotFoundError as e:
+            logging.exception("CSV file not found")
+            raise FileNotFoundError(f"Could not find file: {path}") from e
+        # Drop a possibly cut last line so multi-byte characters stay intact
+        if b"\n" in sample:
+            sample = sample[: sample.rfind(b"\n") + 1]
+
+        for encoding in ("utf-8-sig", "cp1251"):
+            try:
+                text = sample.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            raise ValueError(f"Cannot decode {path} as UTF-8 or CP1251")
+        try:
+            sep = csv.Sniffer().sniff(text, delimiters=",;\t|").delimiter
+        except csv.Error:
+            sep = "\t" if Path(path).suffix.lower() == ".tsv" else ","
+
+        window = list(
+            islice(
+                csv.reader(io.StringIO(text), delimiter=sep),
+                self.config["excel"]["max_header_rows"],
+            )
+        )
+        match = self._find_header(self._window_frame(window))
+        if match is None:
             raise ValueError("Could not detect header row")
 
-        df = pd.read_excel(path, header=header, engine=self.config["excel"]["engine"])
-        id_cols, amt_cols = self.get_column_names(df)
+        try:
+            columns = pd.read_csv(
+                path, sep=sep, encoding=encoding, skiprows=match.row, nrows=0
+            ).columns
+        except (pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+            logging.exception("Error parsing CSV file")
+            raise ValueError(f"Failed to parse CSV file: {str(e)}") from e
+        id_col, amt_col = self._key_columns(columns, match)
+
+        return {
+            "encoding": encoding,
+            "sep": sep,
+            # Semicolon-separated exports come from locales with decimal commas
+            "decimal": "," if sep == ";" else ".",
+            "header": match.row,
+            "id_col": id_col,
+            "amt_col": amt_col,
+        }
 
-        if not id_cols:
-            raise ValueError(f"ID column not found. Available: {list(df.columns)}")
-        if not amt_cols:
-            raise ValueError(f"Amount column not found. Available: {list(df.columns)}")
+    def read_csv(
+        self, path, layout: Dict, chunksize: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Read the ID and amount columns of a CSV file as text.
 
-        return df, id_cols[0], amt_cols[0]
+        ``path`` may also be an open binary file. With ``chunksize`` an iterator
+        of DataFrames is returned instead. Values are kept as strings so every
+        chunk is typed identically; decimal commas in amounts are normalized
+        for ``pd.to_numeric``.
+        """
+        try:
+            reader = pd.read_csv(
+                path,
+                sep=layout["sep"],
+                encoding=layout["encoding"],
+                skiprows=layout["header"],
+                usecols=[layout["id_col"], layout["amt_col"]],
+                dtype=str,
+                chunksize=chunksize,
+            )
+        except (pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+            logging.exception("Error parsing CSV file")
+            raise ValueError(f"Failed to parse CSV file: {str(e)}") from e
+
+        def chunks() -> Iterator[pd.DataFrame]:
+            try:
+                for chunk in reader:
+                    yield self._normalize_amounts(chunk, layout)
+            except pd.errors.ParserError as e:
+                logging.exception("Error parsing CSV file")
+                raise ValueError(f"Failed to parse CSV file: {str(e)}") from e
+
+        if chunksize is None:
+            return self._normalize_amounts(reader, layout)
+        return chunks()
+
+    @staticmethod
+    def _normalize_amounts(df: pd.DataFrame, layout: Dict) -> pd.DataFrame:
+        """Rewrite decimal-comma amounts read as text for ``pd.to_numeric``."""
+        if layout["decimal"] == ",":
+            df[layout["amt_col"]] = (
+                df[layout["amt_col"]]
+                .str.replace(r"[\s\u00a0]", "", regex=True)
+                .str.replace(",", ".", regex=False)
+            )
+        return df
+
+    def iter_csv_chunks(
+        self,
+        path: Path,
+        layout: Dict,
+        chunksize: int,
+        progress: Optional[Callable[[float], None]] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """Yield chunks of ``read_csv``, checking ``cancel`` between them.
+
+        ``progress`` receives the fraction of the file's bytes consumed.
+        """
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            for chunk in self.read_csv(f, layout, chunksize=chunksize):
+                if cancel is not None:
+                    cancel.check()
+                if progress and size:
+                    progress(min(f.tell() / size, 1.0))
+                yield chunk
+        if progress:
+            progress(1.0)
+
+    def _read_csv_whole(
+        self,
+        path: Path,
+        layout: Dict,
+        progress: Optional[Callable[[float], None]] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> pd.DataFrame:
+        """Read a whole CSV file in chunks so it can report progress and stop."""
+        chunks = list(
+            self.iter_csv_chunks(path, layout, CSV_CHUNK_ROWS, progress, cancel)
+        )
+        if not chunks:
+            return self.read_csv(path, layout)
+        return pd.concat(chunks, ignore_index=True)
+
+    def _read_csv_arrow(
+        self,
+        path: Path,
+        layout: Dict,
+        progress: Optional[Callable[[float], None]] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> Optional[pd.DataFrame]:
+        """Read the ID and amount columns of a CSV file with pyarrow.
+
+        The file is memory-mapped and its blocks are parsed in parallel on
+        pyarrow's thread pool, and only the two key columns are converted.
+        Amounts written as plain decimals are parsed as numbers directly;
+        otherwise they are read as text, as ``read_csv`` does. The parse runs
+        in one call, so progress is reported and ``cancel`` checked when it
+        returns.
+
+        Returns:
+            The same columns ``read_csv`` returns, or None when pyarrow is not
+            installed or rejects the file (short rows, which pandas pads, or
+            line breaks inside values), so that the pandas reader is used
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pa_csv
+        except ImportError:
+            return None
+
+        id_col, amt_col = layout["id_col"], layout["amt_col"]
+        utf8 = layout["encoding"] in ARROW_UTF8_ENCODINGS
+        amount_types = [pa.string()]
+        if layout["decimal"] == ".":
+            amount_types.insert(0, pa.float64())
+        for amount_type in amount_types:
+            try:
+                with pa.memory_map(str(path)) as source:
+                    # Start after a byte order mark, which would otherwise
+                    # stay in the first column name
+                    bom = codecs.BOM_UTF8
+                    if not (utf8 and source.read(len(bom)) == bom):
+                        source.seek(0)
+                    table = pa_csv.read_csv(
+                        source,
+                        read_options=pa_csv.ReadOptions(
+                            use_threads=True,
+                            encoding="utf8" if utf8 else layout["encoding"],
+                            skip_rows=layout["header"],
+                            block_size=ARROW_BLOCK_BYTES,
+                        ),
+                        parse_options=pa_csv.ParseOptions(delimiter=layout["sep"]),
+                        convert_options=pa_csv.ConvertOptions(
+                            include_columns=[id_col, amt_col],
+                            column_types={id_col: pa.string(), amt_col: amount_type},
+                            null_values=CSV_NULL_VALUES,
+                            strings_can_be_null=True,
+                        ),
+                    )
+            except pa.ArrowException as e:
+                logging.info(
+                    "pyarrow could not read %s as %s: %s", path, amount_type, e
+                )
+                continue
+            if cancel is not None:
+                cancel.check()
+            if progress:
+                progress(1.0)
+            return self._normalize_amounts(table.to_pandas(), layout)
+        return None
+
+    def _read_columnar(
+        self,
+        path: Path,
+        progress: Optional[Callable[[float], None]] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> Tuple[pd.DataFrame, str, str]:
+        """Read the ID and amount columns of a Parquet or Feather/Arrow file.
+
+        The column names are matched against the ID and amount keywords like
+        a sheet's header row, then only those two columns are read from the
+        memory-mapped file.
+
+        Raises:
+            ValueError: If pyarrow is missing or the file cannot be read
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.feather as feather
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError(
+                "Parquet and Feather files require the pyarrow package"
+            ) from None
+
+        name = source_name(path)
+        parquet = Path(path).suffix.lower() == ".parquet"
+        try:
+            with self.stage("detect_header", file=name):
+                if parquet:
+                    names = pq.read_schema(path, memory_map=True).names
+                else:
+                    with pa.memory_map(str(path)) as source:
+                        names = pa.ipc.open_file(source).schema.names
+                match = self._find_header(self._window_frame([names]))
+                if match is None:
+                    raise ValueError("Could not detect header row")
+                id_col, amt_col = self._key_columns(names, match)
+            with self.stage("read", file=name, engine="pyarrow") as record:
+                columns = [id_col, amt_col]
+                if parquet:
+                    table = pq.read_table(path, columns=columns, memory_map=True)
+                else:
+                    table = feather.read_table(path, columns=columns, memory_map=True)
+                if cancel is not None:
+                    cancel.check()
+                df = table.to_pandas()
+                record["rows"] = len(df)
+        except FileNotFoundError as e:
+            logging.exception("File not found")
+            raise FileNotFoundError(f"Could not find file: {path}") from e
+        except pa.ArrowException as e:
+            logging.exception("Error reading %s", path)
+            raise ValueError(f"Failed to read {Path(path).name}: {str(e)}") from e
+        if progress:
+            progress(1.0)
+        return df, id_col, amt_col
+
+    def _read_sheet(
+        self,
+        path: Path,
+        progress: Optional[Callable[[float], None]] = None,
+        cancel: Optional[CancelToken] = None,
+        sheet: Optional[str] = None,
+    ) -> Tuple[pd.DataFrame, HeaderMatch]:
+        """Read the key columns of one worksheet (the first by default) in a
+        single pass with openpyxl."""
+        name = source_name(path, sheet)
+        rows = self._iter_sheet_rows(path, progress, cancel, sheet)
+        try:
+            with self.stage("detect_header", file=name) as record:
+                window = list(islice(rows, self.config["excel"]["max_header_rows"]))
+                record["rows"] = len(window)
+                match = self._find_header(self._window_frame([list(r) for r in window]))
+            if match is None:
+                raise ValueError("Could not detect header row")
+            positions, match = self._key_projection(match, window[match.row])
+            with self.stage("read", file=name, engine="openpyxl") as record:
+                # Only the key columns are kept; trimmed rows may be shorter
+                data = self._pad_rows(
+                    [
+                        [r[i] if i < len(r) else "" for i in positions]
+                        for r in chain(window, rows)
+                    ]
+                )
+                rows.close()
+                if cancel is not None:
+                    cancel.check()
+                df = self._parse_rows(data, match.row)
+                record["rows"] = len(df)
+        finally:
+            rows.close()
+        return df, match
+
+    @staticmethod
+    def _parse_rows(data: List[List], header: int) -> pd.DataFrame:
+        """Build a DataFrame from padded sheet rows as ``pd.read_excel`` would."""
+        try:
+            parser = TextParser(data, header=header, skip_blank_lines=False)
+            return parser.read()
+        except pd.errors.EmptyDataError as e:
+            logging.exception("Excel file is empty")
+            raise ValueError("The Excel file is empty") from e
+        except pd.errors.ParserError as e:
+            logging.exception("Error parsing Excel file")
+            raise ValueError(f"Failed to parse Excel file: {str(e)}") from e
+
+    def settings_fingerprint(self) -> str:
+        """Hash the settings that influence how a file is parsed and cleaned."""
+        relevant = {
+            key: self.config[key]
+            for key in (
+                "excel",
+                "id_columns",
+                "amount_columns",
+                "skip_rows",
+                "duplicates",
+                "id_normalization",
+            )
+        }
+        return hashlib.blake2b(
+            json.dumps(relevant, sort_keys=True).encode(), digest_size=16
+        ).hexdigest()
+
+    def load_clean(self, path: Path) -> Tuple[pd.DataFrame, str, str]:
+        """Load and preprocess a file, keeping only its ID and amount columns.
+
+        Results are served from the shared parse cache when the file content
+        and parsing settings are unchanged.
+        """
+        return self.load_clean_many([path])[0]
+
+    def load_clean_many(
+        self,
+        paths: List[Path],
+        progress: Optional[Callable[[int, float], None]] = None,
+        cancel: Optional[CancelToken] = None,
+        sheets: Optional[List[Optional[str]]] = None,
+    ) -> List[Tuple[pd.DataFrame, str, str]]:
+        """Load and preprocess several files, parsing them in parallel processes.
+
+        Args:
+            paths: Files to load; a workbook may be listed once per sheet
+            progress: Optional callback receiving the index of a file in
+                ``paths`` and the fraction of its rows parsed so far
+            cancel: Optional token checked between chunks of rows; worker
+                processes stop parsing as soon as it is triggered
+            sheets: Optional sheet name per path; None reads the first sheet
+
+        Returns:
+            One ``(frame, id_column, amount_column)`` entry per path, where the
+            frame holds only the cleaned ID and amount columns
+
+        Raises:
+            OperationCancelled: If ``cancel`` was triggered
+        """
+        results: List[Optional[Tuple[pd.DataFrame, str, str]]] = [None] * len(paths)
+        keys: Dict[int, Tuple] = {}
+        if sheets is None:
+            sheets = [None] * len(paths)
+
+        if self.config["cache"]["enabled"]:
+            cache = get_parse_cache(self.config)
+            fingerprint = self.settings_fingerprint()
+            for i, path in enumerate(paths):
+                try:
+                    keys[i] = cache.make_key(path, fingerprint, sheets[i])
+                except FileNotFoundError as e:
+                    logging.exception("Excel file not found")
+                    raise FileNotFoundError(f"Could not find file: {path}") from e
+                results[i] = cache.get(keys[i])
+                if results[i] is not None:
+                    logging.info(
+                        "Using cached data for %s", source_name(path, sheets[i])
+                    )
+                    if progress:
+                        progress(i, 1.0)
+
+        todo = [i for i, entry in enumerate(results) if entry is None]
+        workers = worker_count(self.config["loading"]["processes"])
+        if len(todo) < 2 or workers <= 1:
+            for i in todo:
+                report = (lambda f, i=i: progress(i, f)) if progress else None
+                results[i] = self._load_clean_uncached(
+                    paths[i], report, cancel, sheets[i]
+                )
+        else:
+            loaded = self._load_in_processes(paths, todo, progress, cancel, sheets)
+            for i, entry in zip(todo, loaded):
+                results[i] = entry
+
+        if keys:
+            for i in todo:
+                cache.put(keys[i], results[i])
+        return results
+
+    def _load_in_processes(
+        self,
+        paths: List[Path],
+        todo: List[int],
+        progress: Optional[Callable[[int, float], None]],
+        cancel: Optional[CancelToken] = None,
+        sheets: Optional[List[Optional[str]]] = None,
+    ) -> List[Tuple[pd.DataFrame, str, str]]:
+        """Parse the selected paths in the shared worker process pool."""
+        if sheets is None:
+            sheets = [None] * len(paths)
+        pool, progress_queue = get_process_pool(
+            worker_count(self.config["loading"]["processes"])
+        )
+        job = uuid.uuid4().hex
+        cancel_event = get_process_manager().Event() if cancel is not None else None
+        instrument = self.recorder.trace_allocations if self.recorder else None
+        try:
+            futures = [
+                pool.submit(
+                    _load_clean_in_worker,
+                    self.config,
+                    paths[i],
+                    job,
+                    i,
+                    cancel_event,
+                    instrument,
+                    sheets[i],
+                )
+                for i in todo
+            ]
+        except BrokenProcessPool:
+            shutdown_process_pool()
+            raise RuntimeError("File loading processes stopped unexpectedly")
+
+        pending = set(futures)
+        while pending:
+            _, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            if cancel is not None and cancel.cancelled:
+                # Running workers stop at their next checkpoint and drop their
+                # rows; queued files are never started
+                cancel_event.set()
+                for future in futures:
+                    future.cancel()
+                raise OperationCancelled()
+            while True:
+                try:
+                    sender, index, fraction = progress_queue.get_nowait()
+                except queue.Empty:
+                    break
+                # Messages of other jobs sharing the pool carry progress only
+                if sender == job and progress:
+                    progress(index, fraction)
+
+        try:
+            loaded = [future.result() for future in futures]
+        except BrokenProcessPool:
+            shutdown_process_pool()
+            raise RuntimeError("File loading processes stopped unexpectedly")
+
+        if self.recorder is not None:
+            for _, records in loaded:
+                self.recorder.records.extend(records)
+        return [entry for entry, _ in loaded]
+
+    def _load_clean_uncached(
+        self,
+        path: Path,
+        progress: Optional[Callable[[float], None]] = None,
+        cancel: Optional[CancelToken] = None,
+        sheet: Optional[str] = None,
+    ) -> Tuple[pd.DataFrame, str, str]:
+        df, id_col, amt_col = self.load_excel(path, progress, cancel, sheet)
+        if cancel is not None:
+            cancel.check()
+        name = source_name(path, sheet)
+        with self.stage("preprocess", file=name, rows=len(df)):
+            df_clean = self.preprocess_dataframe(df, id_col, amt_col)
+        log_duplicates(name, df_clean.attrs["duplicate_rows"])
+        return df_clean[[id_col, amt_col]], id_col, amt_col
+
+    def sheet_names(self, path: Path) -> List[Optional[str]]:
+        """List the sheets of a file selected by the ``excel.sheets`` pattern.
+
+        The pattern is a case-insensitive wildcard such as ``*`` or ``Day *``.
+        Without a pattern, for CSV, Parquet and Feather files and for workbooks
+        with a single sheet, ``[None]`` stands for the first (only) sheet.
+
+        Raises:
+            ValueError: If no sheet matches the pattern
+        """
+        pattern = self.config["excel"]["sheets"]
+        if not pattern or Path(path).suffix.lower() in CSV_SUFFIXES + COLUMNAR_SUFFIXES:
+            return [None]
+        try:
+            engine = self.excel_engine(path)
+            if engine == "openpyxl":
+                wb = load_workbook(path, read_only=True, keep_links=False)
+                try:
+                    names = wb.sheetnames
+                finally:
+                    wb.close()
+            else:
+                with pd.ExcelFile(path, engine=engine) as f:
+                    names = f.sheet_names
+        except FileNotFoundError as e:
+            logging.exception("Excel file not found")
+            raise FileNotFoundError(f"Could not find file: {path}") from e
+        except (InvalidFileException, zipfile.BadZipFile, KeyError, OSError) as e:
+            logging.exception("Error parsing Excel file")
+            raise ValueError(f"Failed to parse Excel file: {str(e)}") from e
+
+        matched = [n for n in names if fnmatchcase(n.lower(), pattern.lower())]
+        # A single-sheet file (e.g. an act next to a monthly registry) has
+        # nothing to choose from
+        if len(names) == 1:
+            return [None]
+        if not matched:
+            raise ValueError(
+                f"No sheets matching '{pattern}' in {Path(path).name}. "
+                f"Available: {names}"
+            )
+        return matched
+
+    def load_sides(
+        self,
+        sides: List[List[Path]],
+        progress: Optional[Callable[[int, float], None]] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> List[Tuple[pd.DataFrame, str, str]]:
+        """Load each side (registry, act) from one or more files.
+
+        Every matching sheet of every file is parsed as its own source, with
+        its own header detection, all in parallel. The sources of a side are
+        then concatenated and the duplicate policy is applied across them.
+
+        Args:
+            sides: Files making up each side, in order
+            progress: Optional callback receiving the index of a side and the
+                fraction of its sources parsed so far
+            cancel: Optional token checked while parsing
+
+        Returns:
+            One ``(frame, id_column, amount_column)`` entry per side
+        """
+        paths, sheets, owners = [], [], []
+        for index, side in enumerate(sides):
+            for path in side:
+                for sheet in self.sheet_names(path):
+                    paths.append(Path(path))
+                    sheets.append(sheet)
+                    owners.append(index)
+
+        fractions = [0.0] * len(paths)
+        counts = [owners.count(index) for index in range(len(sides))]
+
+        def report(i: int, fraction: float) -> None:
+            fractions[i] = fraction
+            side = owners[i]
+            done = sum(f for f, o in zip(fractions, owners) if o == side)
+            progress(side, done / counts[side])
+
+        loaded = self.load_clean_many(
+            paths, report if progress else None, cancel, sheets
+        )
+        return [
+            self.combine_sources(
+                [entry for entry, owner in zip(loaded, owners) if owner == index]
+            )
+            for index in range(len(sides))
+        ]
+
+    def combine_sources(
+        self, entries: List[Tuple[pd.DataFrame, str, str]]
+    ) -> Tuple[pd.DataFrame, str, str]:
+        """Concatenate cleaned sources of one side into a single entry.
+
+        Columns take the names found in the first source. The duplicate policy
+        is applied again across sources; the reported rows per ID count the
+        rows of all sources.
+        """
+        if len(entries) == 1:
+            return entries[0]
+        _, id_col, amt_col = entries[0]
+        frames = [
+            pd.DataFrame(
+                {id_col: df[src_id].to_numpy(), amt_col: df[src_amt].to_numpy()}
+            )
+            for df, src_id, src_amt in entries
+        ]
+        with self.stage("combine", rows=sum(len(df) for df in frames)):
+            combined = self.collapse_duplicates(
+                pd.concat(frames, ignore_index=True), id_col, amt_col
+            )
+        combined.attrs["duplicate_rows"] = self._total_rows(
+            combined.attrs["duplicate_rows"],
+            [df.attrs.get("duplicate_rows") for df, _, _ in entries],
+        )
+        return combined, id_col, amt_col
 
     def preprocess_dataframe(
-        self, df: pd.DataFrame, id_col: str, amount_col: str
+        self,
+        df: pd.DataFrame,
+        id_col: str,
+        amount_col: str,
+        deduplicate: bool = True,
     ) -> pd.DataFrame:
-        """Clean and preprocess DataFrame for comparison."""
+        """Clean and preprocess DataFrame for comparison.
+
+        ``deduplicate=False`` keeps repeated IDs, for callers that remove them
+        after combining chunks. IDs are rewritten as text first when any
+        ``id_normalization`` step is enabled; IDs left empty are dropped.
+        """
+        df = df.loc[df[id_col].notna()]
+        settings = self.config["id_normalization"]
+        if normalization_enabled(settings):
+            df = df.assign(**{id_col: normalize_ids(df[id_col], settings)})
+            df = df.loc[df[id_col] != ""]
+
         # Filter out totals and empty rows
-        mask = df[id_col].notna() & ~df[id_col].astype(str).str.lower().isin(
-            self.config["skip_rows"]
-        )
+        mask = ~df[id_col].astype(str).str.lower().isin(self.config["skip_rows"])
         df_clean = df.loc[mask].copy()
 
-        # Remove duplicates and convert amounts to numeric
-        df_clean = df_clean.drop_duplicates(subset=[id_col])
+        # Convert amounts to numeric and apply the duplicate policy
         df_clean[amount_col] = pd.to_numeric(
             df_clean[amount_col], errors="coerce"
         ).fillna(0)
+        if deduplicate:
+            df_clean = self.collapse_duplicates(df_clean, id_col, amount_col)
 
         return df_clean
 
+    def collapse_duplicates(
+        self, df: pd.DataFrame, id_col: str, amount_col: str
+    ) -> pd.DataFrame:
+        """Keep one row per ID according to the ``duplicates`` policy.
+
+        ``first`` keeps the first row of each ID, ``sum`` keeps it with the
+        amounts of all its rows added up and ``error`` rejects the file. IDs
+        are matched by their text, as in the comparison. The number of rows
+        of each repeated ID is reported in ``attrs["duplicate_rows"]``, a
+        ``DuplicateRows`` mapping of ID text to rows.
+
+        Raises:
+            ValueError: If the policy is unknown, or is ``error`` and an ID
+                appears on several rows
+        """
+        policy = self.config["duplicates"]
+        if policy not in DUPLICATE_POLICIES:
+            raise ValueError(f"Unknown duplicate policy: {policy}")
+
+        encoded = encode_ids([df[id_col]])
+        if encoded.labels is None:
+            codes, uniques = pd.factorize(encoded.keys[0])
+            count = len(uniques)
+        else:
+            codes, count = encoded.keys[0], len(encoded.labels)
+        if count == len(df):
+            df.attrs["duplicate_rows"] = DuplicateRows()
+            return df
+
+        # Codes are numbered in order of first appearance, so the running
+        # maximum grows exactly at the first row of each ID
+        highest = np.maximum.accumulate(codes)
+        first = np.empty(len(codes), dtype=bool)
+        first[0] = True
+        first[1:] = highest[1:] > highest[:-1]
+
+        rows = np.bincount(codes, minlength=count)
+        repeated = np.flatnonzero(rows > 1)
+        first_ids = df[id_col].to_numpy()[first]
+        if policy == "error":
+            sample = ", ".join(str(first_ids[code]) for code in repeated[:5])
+            raise ValueError(
+                f"{len(repeated)} IDs appear on several rows, e.g. {sample}"
+            )
+
+        result = df.loc[first].copy()
+        if policy == "sum":
+            units = np.bincount(
+                codes, weights=to_minor_units(df[amount_col]), minlength=count
+            )
+            result[amount_col] = units / MINOR_UNITS
+        result.attrs["duplicate_rows"] = DuplicateRows(
+            zip(first_ids[repeated].astype(str).tolist(), rows[repeated].tolist())
+        )
+        return result
+
+    @staticmethod
+    def _total_rows(
+        across: Dict[str, int], within: List[Optional[Dict[str, int]]]
+    ) -> DuplicateRows:
+        """Count all rows of each repeated ID from per-source reports.
+
+        ``across`` counts the sources holding an ID (where more than one);
+        each ``within`` report counts the rows of IDs repeated in one source.
+        """
+        total = DuplicateRows(across)
+        for report in within:
+            for id_text, rows in (report or {}).items():
+                total[id_text] = total.get(id_text, 1) + rows - 1
+        return total
+
     def find_discrepancies(
         self,
         reg_df: pd.DataFrame,
@@ -131,23 +1722,72 @@ class ExcelProcessor:
         reg_amt: str,
         act_id: str,
         act_amt: str,
+        cancel: Optional[CancelToken] = None,
     ) -> pd.DataFrame:
-        """Compare registry and act data to find discrepancies."""
-        # Prepare data for comparison
-        registry = pd.DataFrame(
-            {"ID": reg_df[reg_id].astype(str), "Registry": reg_df[reg_amt]}
-        )
-        act = pd.DataFrame({"ID": act_df[act_id].astype(str), "Act": act_df[act_amt]})
+        """Compare registry and act data to find discrepancies.
 
-        # Merge and find differences
-        merged = pd.merge(registry, act, on="ID", how="outer").fillna(0)
-        merged["Diff"] = merged["Registry"] - merged["Act"]
+        Returns all discrepancies in one frame ordered by ID; see ``compare``
+        for the same result split by kind.
+        """
+        result = self.compare(reg_df, act_df, reg_id, reg_amt, act_id, act_amt, cancel)
+        return result.combined(self.config["epsilon"])
 
-        # Filter by configured epsilon
-        diffs = merged.loc[merged["Diff"].abs() > self.config["epsilon"]]
+    def compare(
+        self,
+        reg_df: pd.DataFrame,
+        act_df: pd.DataFrame,
+        reg_id: str,
+        reg_amt: str,
+        act_id: str,
+        act_amt: str,
+        cancel: Optional[CancelToken] = None,
+    ) -> ComparisonResult:
+        """Compare registry and act data without building a full outer merge.
+
+        IDs are encoded as int64 keys and joined with ``join_keys``; only the
+        rows that differ are turned into frames. IDs must be unique within
+        each frame, as ``preprocess_dataframe`` leaves them. ``cancel`` is
+        checked between encoding, joining and building the results.
+        """
+        with self.stage("merge", rows=len(reg_df) + len(act_df)):
+            # Encode IDs as int64 keys and amounts as int64 minor units
+            ids = encode_ids([reg_df[reg_id], act_df[act_id]])
+            reg_keys, act_keys = ids.keys
+            reg_units = to_minor_units(reg_df[reg_amt])
+            act_units = to_minor_units(act_df[act_amt])
+            if cancel is not None:
+                cancel.check()
 
-        # Format numeric columns
-        for col in ["Registry", "Act", "Diff"]:
-            diffs[col] = diffs[col].map(lambda x: f"{x:,.2f}")
+            match = join_keys(reg_keys, act_keys)
+            if cancel is not None:
+                cancel.check()
+            found = match >= 0
+            in_registry = np.zeros(len(act_keys), dtype=bool)
+            in_registry[match[found]] = True
 
-        return diffs
+            # Compare matched amounts in exact minor units against epsilon
+            reg_rows = np.flatnonzero(found)
+            act_rows = match[found]
+            diff = reg_units[reg_rows] - act_units[act_rows]
+            hit = np.abs(diff) > round(self.config["epsilon"] * MINOR_UNITS, 6)
+            reg_rows, act_rows = reg_rows[hit], act_rows[hit]
+
+            only_reg = ~found
+            only_act = ~in_registry
+            return ComparisonResult(
+                mismatched=discrepancy_frame(
+                    decode_ids(reg_keys[reg_rows], ids.labels),
+                    reg_units[reg_rows],
+                    act_units[act_rows],
+                ),
+                only_registry=discrepancy_frame(
+                    decode_ids(reg_keys[only_reg], ids.labels),
+                    reg_units[only_reg],
+                    np.zeros(int(only_reg.sum()), dtype=np.int64),
+                ),
+                only_act=discrepancy_frame(
+                    decode_ids(act_keys[only_act], ids.labels),
+                    np.zeros(int(only_act.sum()), dtype=np.int64),
+                    act_units[only_act],
+                ),
+            )
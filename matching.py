@@ -0,0 +1,321 @@
+"""ID normalization and near-match lookup for IDs written differently.
+
+``normalize_ids`` rewrites ID text before the exact comparison so that, for
+example, "00012345" and "12345.0" become the same ID. ``near_matches`` pairs
+the IDs still found on one side only with similar IDs of the other side,
+using a character trigram index to pick candidates and the edit distance to
+score them. Both work on whole columns with pyarrow, pandas and numpy.
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+NEAR_MATCH_COLUMNS = ["Registry ID", "Act ID", "Confidence", "Registry", "Act", "Diff"]
+
+# Candidates kept per registry ID before scoring
+CANDIDATES = 5
+
+# Trigrams shared by more act IDs than this (and than STOP_SHARE of them)
+# say little about similarity and are left out of the index
+STOP_POSTINGS = 100
+STOP_SHARE = 0.02
+
+# Candidate pairs counted at a time, which bounds the memory used
+PAIR_BLOCK = 2_000_000
+
+# Code points marking the start and end of an ID in its trigrams; both lie
+# just past the Unicode range, so every code fits in 21 bits
+_START = 0x110000
+_END = 0x110001
+
+
+def normalization_steps(settings: Dict) -> List[Tuple[str, ...]]:
+    """Translate the ``id_normalization`` settings into text operations.
+
+    Each step is ("strip",), ("lower",) or ("replace", pattern, replacement),
+    where the pattern is understood alike by Python's ``re`` and by RE2, the
+    engine of pyarrow.
+
+    Raises:
+        ValueError: If a prefix pattern is not a valid regular expression
+    """
+    steps = []
+    if settings["strip"]:
+        steps.append(("strip",))
+    if settings["lowercase"]:
+        steps.append(("lower",))
+    if settings["remove_prefixes"]:
+        patterns = "|".join(f"(?:{p})" for p in settings["remove_prefixes"])
+        prefix = f"(?i)^(?:{patterns})"
+        try:
+            re.compile(prefix)
+        except re.error as e:
+            raise ValueError(f"Invalid ID prefix pattern: {e}") from e
+        steps.append(("replace", prefix, ""))
+        if settings["strip"]:
+            steps.append(("strip",))
+    if settings["float_suffix"]:
+        steps.append(("replace", r"^([+-]?[0-9]+)\.0*$", r"\1"))
+    if settings["leading_zeros"]:
+        # Keeps the last zero before a non-digit: "000" -> "0", "00a" -> "0a"
+        steps.append(("replace", r"^0+([0-9])", r"\1"))
+    return steps
+
+
+def normalize_ids(ids: pd.Series, settings: Dict) -> pd.Series:
+    """Rewrite ID text according to the ``id_normalization`` settings.
+
+    Steps run in this order: ``strip`` surrounding whitespace, ``lowercase``,
+    remove the first matching ``remove_prefixes`` pattern (case-insensitive
+    regular expressions anchored at the start), drop a ``float_suffix`` such
+    as the ".0" of "12345.0", and drop ``leading_zeros`` ("00123" -> "123").
+    The steps run as pyarrow compute kernels when pyarrow is installed and
+    as pandas string methods otherwise, with the same result.
+
+    Args:
+        ids: ID column without missing values
+        settings: The ``id_normalization`` section of config.yaml
+
+    Returns:
+        The normalized IDs as text
+
+    Raises:
+        ValueError: If a prefix pattern is not a valid regular expression
+    """
+    text = ids.astype(str)
+    steps = normalization_steps(settings)
+    normalized = _normalize_with_arrow(text, steps)
+    if normalized is not None:
+        return normalized
+
+    for step in steps:
+        if step[0] == "strip":
+            text = text.str.strip()
+        elif step[0] == "lower":
+            text = text.str.lower()
+        else:
+            text = text.str.replace(step[1], step[2], n=1, regex=True)
+    return text
+
+
+def _normalize_with_arrow(
+    text: pd.Series, steps: List[Tuple[str, ...]]
+) -> Optional[pd.Series]:
+    """Apply normalization steps with pyarrow, or return None if unavailable.
+
+    None is also returned for prefix patterns RE2 does not support, such as
+    lookarounds, so that pandas applies them instead.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        return None
+
+    array = pa.array(text.to_numpy(dtype=object), type=pa.string())
+    try:
+        for step in steps:
+            if step[0] == "strip":
+                array = pc.utf8_trim_whitespace(array)
+            elif step[0] == "lower":
+                array = pc.utf8_lower(array)
+            else:
+                array = pc.replace_substring_regex(
+                    array, step[1], step[2], max_replacements=1
+                )
+    except pa.ArrowInvalid as e:
+        logging.info("Normalizing IDs with pandas: %s", e)
+        return None
+    return pd.Series(
+        array.to_numpy(zero_copy_only=False), index=text.index, name=text.name
+    )
+
+
+def normalization_enabled(settings: Dict) -> bool:
+    """Whether any ``id_normalization`` step is switched on."""
+    return any(settings.values())
+
+
+def near_matches(
+    diffs: pd.DataFrame, min_confidence: float, candidates: int = CANDIDATES
+) -> pd.DataFrame:
+    """Pair IDs found on one side only with similar IDs of the other side.
+
+    IDs with an amount in the registry and none in the act are matched
+    against IDs with the opposite pattern; a zero amount counts as missing,
+    as in the discrepancy report. Each ID is used in at most one pair, the
+    most confident pairs being chosen first.
+
+    Args:
+        diffs: Result of ``ExcelProcessor.find_discrepancies``
+        min_confidence: Lowest confidence reported, from 0 to 1
+        candidates: Act IDs scored per registry ID
+
+    Returns:
+        Frame with ``NEAR_MATCH_COLUMNS`` ordered by registry ID, where
+        Confidence is one minus the edit distance divided by the length of
+        the longer ID
+    """
+    registry = diffs.loc[(diffs["Act"] == 0) & (diffs["Registry"] != 0)]
+    act = diffs.loc[(diffs["Registry"] == 0) & (diffs["Act"] != 0)]
+    reg_ids = registry["ID"].astype(str).to_numpy(dtype=object)
+    act_ids = act["ID"].astype(str).to_numpy(dtype=object)
+    if not len(reg_ids) or not len(act_ids):
+        return pd.DataFrame(columns=NEAR_MATCH_COLUMNS)
+
+    left, right = _candidate_pairs(reg_ids, act_ids, candidates)
+    confidence = 1 - _edit_distances(reg_ids[left], act_ids[right]) / np.maximum(
+        np.maximum(_lengths(reg_ids[left]), _lengths(act_ids[right])), 1
+    )
+    keep = confidence >= min_confidence
+    left, right, confidence = left[keep], right[keep], confidence[keep]
+
+    # Greedy one-to-one assignment, most confident pairs first
+    order = np.lexsort((right, left, -confidence))
+    used_left, used_right, chosen = set(), set(), []
+    for k in order.tolist():
+        a, b = int(left[k]), int(right[k])
+        if a not in used_left and b not in used_right:
+            used_left.add(a)
+            used_right.add(b)
+            chosen.append(k)
+    chosen = np.asarray(chosen, dtype=np.int64)
+
+    reg_amounts = registry["Registry"].to_numpy()[left[chosen]]
+    act_amounts = act["Act"].to_numpy()[right[chosen]]
+    result = pd.DataFrame(
+        {
+            "Registry ID": reg_ids[left[chosen]],
+            "Act ID": act_ids[right[chosen]],
+            "Confidence": np.round(confidence[chosen], 3),
+            "Registry": reg_amounts,
+            "Act": act_amounts,
+            "Diff": reg_amounts - act_amounts,
+        },
+        columns=NEAR_MATCH_COLUMNS,
+    )
+    return result.sort_values("Registry ID", kind="mergesort").reset_index(drop=True)
+
+
+def _lengths(ids: np.ndarray) -> np.ndarray:
+    return np.fromiter(map(len, ids), dtype=np.int64, count=len(ids))
+
+
+def _code_matrix(ids: np.ndarray) -> np.ndarray:
+    """Code points of each ID as a row, padded with zeros to the longest."""
+    text = np.asarray(ids.tolist(), dtype=str)
+    if text.dtype.itemsize == 0:
+        return np.zeros((len(ids), 0), dtype=np.int64)
+    return text.view(np.uint32).reshape(len(ids), -1).astype(np.int64)
+
+
+def _trigrams(ids: np.ndarray) -> pd.DataFrame:
+    """Distinct trigrams of each ID as (gram, row) pairs.
+
+    An ID of n characters has n + 1 trigrams, counting the two start markers
+    and the end marker; codes are packed into one int64 per trigram.
+    """
+    codes = _code_matrix(ids)
+    lengths = _lengths(ids)
+    rows, width = codes.shape
+    padded = np.zeros((rows, width + 3), dtype=np.int64)
+    padded[:, :2] = _START
+    padded[:, 2 : width + 2] = codes
+    padded[np.arange(rows), lengths + 2] = _END
+    grams = (padded[:, :-2] << 42) | (padded[:, 1:-1] << 21) | padded[:, 2:]
+    valid = np.arange(width + 1) <= lengths[:, None]
+    postings = pd.DataFrame(
+        {"gram": grams[valid], "row": np.nonzero(valid)[0]}
+    ).drop_duplicates()
+    return postings
+
+
+def _candidate_pairs(
+    reg_ids: np.ndarray, act_ids: np.ndarray, candidates: int
+) -> List[np.ndarray]:
+    """Return (registry row, act row) arrays of the best candidates per ID.
+
+    Candidates are ranked by the Dice coefficient of their trigram sets.
+    """
+    reg_grams = _trigrams(reg_ids)
+    act_grams = _trigrams(act_ids)
+    reg_sizes = np.bincount(reg_grams["row"], minlength=len(reg_ids))
+    act_sizes = np.bincount(act_grams["row"], minlength=len(act_ids))
+
+    # Act postings sorted by trigram, without the most common trigrams
+    frequency = act_grams["gram"].map(act_grams["gram"].value_counts())
+    limit = max(STOP_POSTINGS, STOP_SHARE * len(act_ids))
+    act_grams = act_grams.loc[frequency.to_numpy() <= limit].sort_values("gram")
+    act_keys = act_grams["gram"].to_numpy()
+    act_rows = act_grams["row"].to_numpy()
+
+    # Range of matching act postings for each registry posting
+    reg_grams = reg_grams.sort_values("row", kind="mergesort")
+    starts = np.searchsorted(act_keys, reg_grams["gram"].to_numpy(), "left")
+    ends = np.searchsorted(act_keys, reg_grams["gram"].to_numpy(), "right")
+    reg_posting_rows = reg_grams["row"].to_numpy()
+    counts = ends - starts
+
+    # Split registry IDs into blocks of about PAIR_BLOCK candidate pairs
+    per_row = np.bincount(reg_posting_rows, weights=counts, minlength=len(reg_ids))
+    block_of_row = (np.cumsum(per_row) // PAIR_BLOCK).astype(np.int64)
+    block_of_posting = block_of_row[reg_posting_rows]
+
+    lefts, rights = [], []
+    for block in np.unique(block_of_posting):
+        part = block_of_posting == block
+        left = np.repeat(reg_posting_rows[part], counts[part])
+        if not len(left):
+            continue
+        # Positions of the act postings: each range start..end laid end to end
+        offsets = np.repeat(
+            starts[part] - np.cumsum(counts[part]) + counts[part], counts[part]
+        )
+        right = act_rows[offsets + np.arange(len(left))]
+
+        pairs, shared = np.unique(left * len(act_ids) + right, return_counts=True)
+        left, right = pairs // len(act_ids), pairs % len(act_ids)
+        dice = 2 * shared / (reg_sizes[left] + act_sizes[right])
+
+        # Keep the top candidates of each registry ID; pairs are ordered by
+        # registry row, and a stable sort on row minus half the Dice
+        # coefficient ranks each row's candidates without a full lexsort
+        order = np.argsort(left - dice / 2, kind="stable")
+        left, right = left[order], right[order]
+        first = np.r_[True, left[1:] != left[:-1]]
+        group_start = np.maximum.accumulate(np.where(first, np.arange(len(left)), 0))
+        top = np.arange(len(left)) - group_start < candidates
+        lefts.append(left[top])
+        rights.append(right[top])
+
+    if not lefts:
+        return [np.empty(0, dtype=np.int64)] * 2
+    return [np.concatenate(lefts), np.concatenate(rights)]
+
+
+def _edit_distances(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Levenshtein distance of each pair of IDs, computed for all pairs at once.
+
+    The dynamic programming table is filled one row per character of the
+    left IDs; within a row the insertion chain is a running minimum.
+    """
+    a, b = _code_matrix(left), _code_matrix(right)
+    a_len, b_len = _lengths(left), _lengths(right)
+    pairs = np.arange(len(left))
+    steps = np.arange(b.shape[1] + 1)
+    previous = np.broadcast_to(steps, (len(left), len(steps))).copy()
+    distance = b_len.copy()  # Distances of empty left IDs
+    for i in range(1, a.shape[1] + 1):
+        cost = (b != a[:, i - 1 : i]).astype(np.int64)
+        best = np.empty_like(previous)
+        best[:, 0] = i
+        best[:, 1:] = np.minimum(previous[:, 1:] + 1, previous[:, :-1] + cost)
+        current = np.minimum.accumulate(best - steps, axis=1) + steps
+        done = a_len == i
+        distance[done] = current[pairs[done], b_len[done]]
+        previous = current
+    return distance
@@ -0,0 +1,61 @@
+"""Configuration, translations and stylesheet shared by the application.
+
+This module only needs PyYAML, so the GUI can read its settings and show the
+first window before pandas and openpyxl are imported.
+"""
+
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Dict
+
+import yaml
+
+# Base directory for resources
+BASE_DIR = Path(__file__).parent.resolve()
+
+
+def resource_path(relative_path: str) -> str:
+    """Get absolute path to resource for PyInstaller compatibility."""
+    base_path = getattr(sys, "_MEIPASS", BASE_DIR)
+    return str(Path(base_path) / relative_path)
+
+
+def load_config() -> Dict:
+    """Load application configuration from config.yaml."""
+    config_path = Path(__file__).parent / "config.yaml"
+    with open(config_path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def log_path(config: Dict) -> Path:
+    """Return the application log file named in the configuration."""
+    return Path.home() / config.get("log_path", "discrepancy_finder.log")
+
+
+def load_translation(lang_code: str) -> Dict[str, str]:
+    """Load language translations from i18n/[lang_code].json.
+
+    Args:
+        lang_code: Two-letter language code ('en' or 'ru')
+
+    Returns:
+        Dictionary with translation strings
+
+    Raises:
+        FileNotFoundError: If there is no translation for the language
+    """
+    try:
+        i18n_path = Path(__file__).parent / "i18n" / f"{lang_code}.json"
+        with open(i18n_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError as e:
+        logging.exception("Translation file not found")
+        raise FileNotFoundError(f"Translation file for {lang_code} not found") from e
+
+
+def load_stylesheet() -> str:
+    """Read the global Qt stylesheet."""
+    with open(BASE_DIR / "style.qss", "r") as f:
+        return f.read()
@@ -0,0 +1,151 @@
+"""Incremental re-comparison of a registry and an act.
+
+Users typically fix one file (usually the act) and compare again while the
+other stays the same. ``ComparisonSession`` keeps each side's cleaned data,
+its ID index and the last result between comparisons. When only one side
+changed, only that side is parsed again and only the IDs whose presence or
+amount changed are compared; the rest of the previous result is kept.
+"""
+
+import logging
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from logic import (
+    MINOR_UNITS,
+    CancelToken,
+    ExcelProcessor,
+    IndexedIds,
+    discrepancy_frame,
+    get_parse_cache,
+)
+
+
+class _Side(IndexedIds):
+    """One side of the last comparison with the signature of its files."""
+
+    def __init__(self, signature: Tuple, entry: Tuple[pd.DataFrame, str, str]):
+        super().__init__(entry)
+        self.signature = signature
+
+
+class ComparisonSession:
+    """Keep the last comparison so that a re-comparison only redoes changes."""
+
+    def __init__(self):
+        self.sides: List[Optional[_Side]] = [None, None]
+        self.result: Optional[pd.DataFrame] = None
+        self._settings: Optional[Tuple] = None
+
+    def reset(self) -> None:
+        """Forget the previous comparison."""
+        self.sides = [None, None]
+        self.result = None
+        self._settings = None
+
+    def compare(
+        self,
+        processor: ExcelProcessor,
+        registry_paths: List[Path],
+        act_paths: List[Path],
+        progress: Optional[Callable[[int, float], None]] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> pd.DataFrame:
+        """Compare the files, reusing whatever did not change since last time.
+
+        Args:
+            processor: Processor whose settings and recorder are used
+            registry_paths: Files making up the registry
+            act_paths: Files making up the act
+            progress: Optional callback receiving the index of a side (0 for
+                the registry) and the fraction of it parsed so far
+            cancel: Optional token; a cancelled run leaves the session as
+                it was
+
+        Returns:
+            The same frame ``find_discrepancies`` returns for these files
+        """
+        fingerprint = processor.settings_fingerprint()
+        settings = (fingerprint, processor.config["epsilon"])
+        if settings != self._settings:
+            self.reset()
+
+        sources = [registry_paths, act_paths]
+        cache = get_parse_cache(processor.config)
+        signatures = [
+            tuple(cache.make_key(path, fingerprint) for path in paths)
+            for paths in sources
+        ]
+        stale = [
+            i
+            for i, side in enumerate(self.sides)
+            if side is None or side.signature != signatures[i]
+        ]
+        if not stale:
+            logging.info("Files unchanged, reusing the previous result")
+            return self.result
+
+        report = (lambda n, f: progress(stale[n], f)) if progress else None
+        loaded = processor.load_sides([sources[i] for i in stale], report, cancel)
+        sides = list(self.sides)
+        for i, entry in zip(stale, loaded):
+            sides[i] = _Side(signatures[i], entry)
+
+        if self.result is None or len(stale) == len(sides):
+            (reg_df, reg_id, reg_amt), (act_df, act_id, act_amt) = (
+                side.entry for side in sides
+            )
+            result = processor.find_discrepancies(
+                reg_df, act_df, reg_id, reg_amt, act_id, act_amt, cancel=cancel
+            )
+        else:
+            changed = stale[0]
+            result = self._update(
+                processor, self.sides[changed], sides[changed], sides, cancel
+            )
+
+        self.sides = sides
+        self.result = result
+        self._settings = settings
+        return result
+
+    def _update(
+        self,
+        processor: ExcelProcessor,
+        old: _Side,
+        new: _Side,
+        sides: List[_Side],
+        cancel: Optional[CancelToken] = None,
+    ) -> pd.DataFrame:
+        """Recompute the previous result for the IDs that differ between the
+        old and new version of one side."""
+        with processor.stage("update", rows=len(new.ids)) as record:
+            # IDs added or with a new amount, then IDs no longer present
+            pos = old.positions(new.ids)
+            changed = pos < 0
+            kept = np.flatnonzero(~changed)
+            changed[kept] = old.units[pos[kept]] != new.units[kept]
+            removed = new.positions(old.ids) < 0
+            affected = np.concatenate([new.ids[changed], old.ids[removed]])
+            if cancel is not None:
+                cancel.check()
+
+            # A missing amount counts as zero, as in ComparisonResult.combined
+            reg_units = sides[0].lookup(affected)
+            act_units = sides[1].lookup(affected)
+            threshold = round(processor.config["epsilon"] * MINOR_UNITS, 6)
+            hit = np.abs(reg_units - act_units) > threshold
+            rows = discrepancy_frame(affected[hit], reg_units[hit], act_units[hit])
+
+            previous = self.result.loc[~self.result["ID"].isin(affected)]
+            frames = [frame for frame in (previous, rows) if len(frame)] or [rows]
+            record["changed"] = len(affected)
+            logging.info("Re-compared %s changed IDs", len(affected))
+            return (
+                pd.concat(frames, ignore_index=True)
+                .sort_values("ID", kind="mergesort")
+                .reset_index(drop=True)
+            )
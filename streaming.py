@@ -0,0 +1,233 @@
+"""Out-of-core comparison for inputs that do not fit in memory.
+
+Both sides are read in chunks, cleaned and hash-partitioned by ID into
+temporary spill files. Each partition is then compared on its own with
+``ExcelProcessor.find_discrepancies``, so every ID is seen together with all
+its rows while only one partition is held in memory at a time. The combined
+result is identical to the in-memory comparison.
+"""
+
+import logging
+import math
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from logic import (
+    CSV_SUFFIXES,
+    CancelToken,
+    ExcelProcessor,
+    discrepancy_frame,
+    log_duplicates,
+    source_name,
+)
+
+# Rough in-memory size of a parsed file relative to its size on disk. XLSX is
+# compressed XML, CSV is plain text; both become Python objects when parsed.
+# Parquet is compressed and Feather/Arrow are close to Arrow's memory layout.
+MEMORY_FACTORS = {".csv": 4, ".tsv": 4, ".parquet": 8, ".feather": 4, ".arrow": 4}
+DEFAULT_MEMORY_FACTOR = 12
+
+# A partition is loaded twice (both sides) and merged, which roughly triples
+# its footprint, so partitions are sized at a third of the budget.
+PARTITION_OVERHEAD = 3
+
+# Share of the progress bar spent reading and partitioning the inputs
+SPILL_SHARE = 0.6
+
+
+def estimated_memory(paths: List[Path]) -> int:
+    """Estimate the bytes needed to compare the given files in memory."""
+    return sum(
+        Path(p).stat().st_size
+        * MEMORY_FACTORS.get(Path(p).suffix.lower(), DEFAULT_MEMORY_FACTOR)
+        for p in paths
+    )
+
+
+def needs_partitioning(config: Dict, paths: List[Path]) -> bool:
+    """Return True if the inputs are expected to exceed the memory budget."""
+    budget = config["streaming"]["memory_budget_mb"] * 1024 * 1024
+    return estimated_memory(paths) > budget
+
+
+class PartitionedComparison:
+    """Compare registry and act files partition by partition."""
+
+    def __init__(self, processor: ExcelProcessor):
+        self.processor = processor
+        self.settings = processor.config["streaming"]
+        self.totals = {"registry": 0.0, "act": 0.0}
+
+    def partition_count(self, paths: List[Path]) -> int:
+        """Choose the number of partitions that keeps each within the budget."""
+        budget = self.settings["memory_budget_mb"] * 1024 * 1024
+        return max(1, math.ceil(PARTITION_OVERHEAD * estimated_memory(paths) / budget))
+
+    def compare(
+        self,
+        registry_paths: List[Path],
+        act_paths: List[Path],
+        progress: Optional[Callable[[float], None]] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> pd.DataFrame:
+        """Find discrepancies between the registry and act files.
+
+        Args:
+            registry_paths: One or more registry files (parts of one registry);
+                workbooks contribute every sheet matching ``excel.sheets``
+            act_paths: One or more act files
+            progress: Optional callback receiving the overall fraction done
+            cancel: Optional token checked between chunks and partitions; the
+                spill files are removed when the comparison is cancelled
+
+        Returns:
+            DataFrame with the same rows and order as ``find_discrepancies``
+
+        Raises:
+            OperationCancelled: If ``cancel`` was triggered
+        """
+        inputs = [
+            (side, Path(path), sheet)
+            for side, paths in (("registry", registry_paths), ("act", act_paths))
+            for path in paths
+            for sheet in self.processor.sheet_names(path)
+        ]
+        partitions = self.partition_count(
+            [Path(p) for p in list(registry_paths) + list(act_paths)]
+        )
+        temp_dir = self.settings["temp_dir"] or None
+        logging.info("Comparing out of core in %s partitions", partitions)
+
+        with tempfile.TemporaryDirectory(prefix="discrepancy-", dir=temp_dir) as tmp:
+            spill_dir = Path(tmp)
+            for n, (side, path, sheet) in enumerate(inputs):
+                # Each input file or sheet gets an equal slice of the spill phase
+                share = SPILL_SHARE / len(inputs)
+                report = (
+                    (lambda f, n=n: progress(share * (n + f))) if progress else None
+                )
+                self._spill(side, path, spill_dir, partitions, report, cancel, sheet)
+
+            results = []
+            self.totals = {"registry": 0.0, "act": 0.0}
+            repeated = {"registry": [], "act": []}
+            for part in range(partitions):
+                if cancel is not None:
+                    cancel.check()
+                reg = self._read_partition(spill_dir / f"registry-{part}.pkl")
+                act = self._read_partition(spill_dir / f"act-{part}.pkl")
+                repeated["registry"].append(reg.attrs["duplicate_rows"])
+                repeated["act"].append(act.attrs["duplicate_rows"])
+                self.totals["registry"] += float(reg["Amount"].sum())
+                self.totals["act"] += float(act["Amount"].sum())
+                if len(reg) or len(act):
+                    results.append(
+                        self.processor.find_discrepancies(
+                            reg, act, "ID", "Amount", "ID", "Amount"
+                        )
+                    )
+                if progress:
+                    progress(SPILL_SHARE + (1 - SPILL_SHARE) * (part + 1) / partitions)
+
+        # Each ID lives in a single partition, so the reports do not overlap
+        for side, reports in repeated.items():
+            log_duplicates(
+                side, {k: v for report in reports for k, v in report.items()}
+            )
+
+        if not results:
+            units = np.zeros(0, dtype=np.int64)
+            return discrepancy_frame(np.empty(0, dtype=object), units, units)
+        # The in-memory outer merge orders rows by ID; partitions are merged
+        # in the same order and a stable sort keeps it within each ID
+        return (
+            pd.concat(results, ignore_index=True)
+            .sort_values("ID", kind="mergesort")
+            .reset_index(drop=True)
+        )
+
+    def _iter_clean_chunks(
+        self,
+        path: Path,
+        progress: Optional[Callable[[float], None]] = None,
+        cancel: Optional[CancelToken] = None,
+        sheet: Optional[str] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """Yield cleaned chunks of a file with ``ID`` and ``Amount`` columns.
+
+        CSV files are read in chunks. An XLSX sheet is parsed whole, which is
+        bounded by Excel's row limit, and then sliced into chunks; so are the
+        two key columns of a Parquet or Feather file.
+        """
+        chunk_rows = self.settings["chunk_rows"]
+        if path.suffix.lower() in CSV_SUFFIXES:
+            layout = self.processor.csv_layout(path)
+            id_col, amt_col = layout["id_col"], layout["amt_col"]
+            chunks = self.processor.iter_csv_chunks(
+                path, layout, chunk_rows, progress, cancel
+            )
+        else:
+            df, id_col, amt_col = self.processor.load_excel(
+                path, progress, cancel, sheet
+            )
+            df = df[[id_col, amt_col]]
+            chunks = (
+                df.iloc[start : start + chunk_rows]
+                for start in range(0, len(df), chunk_rows)
+            )
+
+        for chunk in chunks:
+            clean = self.processor.preprocess_dataframe(
+                chunk, id_col, amt_col, deduplicate=False
+            )
+            yield pd.DataFrame(
+                {"ID": clean[id_col].to_numpy(), "Amount": clean[amt_col].to_numpy()}
+            )
+
+    def _spill(
+        self,
+        side: str,
+        path: Path,
+        spill_dir: Path,
+        partitions: int,
+        progress: Optional[Callable[[float], None]] = None,
+        cancel: Optional[CancelToken] = None,
+        sheet: Optional[str] = None,
+    ) -> None:
+        """Partition the rows of one input file or sheet into its side's spill
+        files.
+
+        Files and chunks are appended in input order, so the first occurrence
+        of an ID stays first within its partition.
+        """
+        name = source_name(path, sheet)
+        with self.processor.stage("spill", file=name) as record:
+            for chunk in self._iter_clean_chunks(path, progress, cancel, sheet):
+                # IDs are compared as strings, so partition on the same key
+                keys = pd.util.hash_pandas_object(chunk["ID"].astype(str), index=False)
+                part_of = keys.to_numpy() % partitions
+                for part, rows in chunk.groupby(part_of, sort=False):
+                    with open(spill_dir / f"{side}-{part}.pkl", "ab") as f:
+                        pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+                record["rows"] = record.get("rows", 0) + len(chunk)
+
+    def _read_partition(self, path: Path) -> pd.DataFrame:
+        """Load one partition of one side and apply the duplicate policy."""
+        chunks = []
+        if path.exists():
+            with open(path, "rb") as f:
+                while True:
+                    try:
+                        chunks.append(pickle.load(f))
+                    except EOFError:
+                        break
+        if not chunks:
+            chunks = [pd.DataFrame({"ID": [], "Amount": []})]
+        return self.processor.collapse_duplicates(
+            pd.concat(chunks, ignore_index=True), "ID", "Amount"
+        )
@@ -0,0 +1,23 @@
+"""Shared fixtures; makes the application modules importable from the tests."""
+
+import copy
+import sys
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from resources import load_config  # noqa: E402
+
+_CONFIG = load_config()
+
+
+@pytest.fixture
+def config() -> Dict:
+    """Default configuration, parsing in-process and without the parse cache."""
+    config = copy.deepcopy(_CONFIG)
+    config["cache"]["enabled"] = False
+    config["loading"]["processes"] = 1
+    return config
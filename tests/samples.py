@@ -0,0 +1,51 @@
+"""Synthetic registry and act files for the tests."""
+
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def make_sides(rows: int = 3000, seed: int = 0) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Build a registry and an act sharing most IDs, with every kind of
+    discrepancy: changed amounts, IDs on one side only, repeated IDs and
+    IDs of mixed format."""
+    rng = np.random.default_rng(seed)
+    ids = np.array(
+        [f"ORD-{n}" if n % 3 == 0 else str(n) for n in range(100_000, 100_000 + rows)],
+        dtype=object,
+    )
+    amounts = rng.integers(1, 10**6, rows) / 100
+
+    registry = pd.DataFrame({"Order ID": ids, "Amount": amounts})
+    act = registry.copy()
+    changed = rng.choice(rows, rows // 20, replace=False)
+    act.loc[changed, "Amount"] += rng.integers(-5000, 5000, len(changed)) / 100
+    act.loc[changed[:3], "Amount"] += 0.004  # Within epsilon
+    registry = registry.drop(index=rng.choice(rows, rows // 50, replace=False))
+    act = act.drop(index=rng.choice(rows, rows // 40, replace=False))
+    # Repeated IDs, handled by the duplicate policy
+    registry = pd.concat([registry, registry.sample(rows // 100, random_state=seed)])
+    act = pd.concat([act, act.sample(rows // 100, random_state=seed + 1)])
+    return (
+        registry.sample(frac=1, random_state=seed).reset_index(drop=True),
+        act.sample(frac=1, random_state=seed + 2).reset_index(drop=True),
+    )
+
+
+def write_csv(frame: pd.DataFrame, path: Path) -> Path:
+    """Write a frame as a semicolon-separated CSV below a title line."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("Report;\n")
+        frame.to_csv(f, sep=";", index=False)
+    return path
+
+
+def write_parts(frame: pd.DataFrame, folder: Path, name: str, parts: int) -> List[Path]:
+    """Split a frame into several CSV files, as a registry sent in parts."""
+    size = -(-len(frame) // parts)
+    return [
+        write_csv(frame.iloc[n * size : (n + 1) * size], folder / f"{name}_{n}.csv")
+        for n in range(parts)
+    ]
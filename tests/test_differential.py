@@ -0,0 +1,132 @@
+"""Out-of-core and incremental comparisons must match a fresh in-memory one."""
+
+import os
+
+import pandas as pd
+import pytest
+
+from logic import ExcelProcessor
+from samples import make_sides, write_csv, write_parts
+from session import ComparisonSession
+from streaming import PartitionedComparison
+
+
+def load_in_memory(config, registry_paths, act_paths):
+    """Load both sides whole, as the in-memory comparison does."""
+    return ExcelProcessor(config).load_sides([registry_paths, act_paths])
+
+
+def compare_in_memory(config, registry_paths, act_paths) -> pd.DataFrame:
+    """Compare files with ``find_discrepancies`` after loading them whole."""
+    (reg_df, reg_id, reg_amt), (act_df, act_id, act_amt) = load_in_memory(
+        config, registry_paths, act_paths
+    )
+    return ExcelProcessor(config).find_discrepancies(
+        reg_df, act_df, reg_id, reg_amt, act_id, act_amt
+    )
+
+
+def assert_same_result(actual: pd.DataFrame, expected: pd.DataFrame) -> None:
+    assert len(expected)
+    pd.testing.assert_frame_equal(
+        actual.reset_index(drop=True).astype({"ID": str}),
+        expected.reset_index(drop=True).astype({"ID": str}),
+    )
+
+
+def rewrite(path, frame) -> None:
+    """Replace a file and make sure its modification time changes."""
+    stat = os.stat(path)
+    write_csv(frame, path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+@pytest.mark.parametrize("duplicates", ["first", "sum"])
+@pytest.mark.parametrize("budget_mb", [0.02, 0.2, 1024])
+def test_partitioned_matches_in_memory(tmp_path, config, duplicates, budget_mb):
+    config["duplicates"] = duplicates
+    config["streaming"].update(memory_budget_mb=budget_mb, chunk_rows=700)
+    registry, act = make_sides()
+    registry_paths = write_parts(registry, tmp_path, "registry", 3)
+    act_paths = [write_csv(act, tmp_path / "act.csv")]
+
+    comparison = PartitionedComparison(ExcelProcessor(config))
+    actual = comparison.compare(registry_paths, act_paths)
+
+    assert_same_result(actual, compare_in_memory(config, registry_paths, act_paths))
+    sides = load_in_memory(config, registry_paths, act_paths)
+    for name, (df, _, amt_col) in zip(("registry", "act"), sides):
+        assert comparison.totals[name] == pytest.approx(df[amt_col].sum())
+
+
+def test_partitioned_uses_several_partitions(tmp_path, config):
+    config["streaming"]["memory_budget_mb"] = 0.02
+    registry, act = make_sides()
+    paths = [
+        write_csv(registry, tmp_path / "registry.csv"),
+        write_csv(act, tmp_path / "act.csv"),
+    ]
+    assert PartitionedComparison(ExcelProcessor(config)).partition_count(paths) > 1
+
+
+@pytest.mark.parametrize("changed_side", ["registry", "act", "both"])
+def test_session_matches_fresh_comparison(tmp_path, config, changed_side):
+    registry, act = make_sides()
+    registry_path = write_csv(registry, tmp_path / "registry.csv")
+    act_path = write_csv(act, tmp_path / "act.csv")
+    processor = ExcelProcessor(config)
+    session = ComparisonSession()
+
+    first = session.compare(processor, [registry_path], [act_path])
+    assert_same_result(first, compare_in_memory(config, [registry_path], [act_path]))
+
+    new_registry, new_act = make_sides(seed=1)
+    if changed_side in ("registry", "both"):
+        rewrite(registry_path, new_registry)
+    if changed_side in ("act", "both"):
+        rewrite(act_path, new_act)
+    second = session.compare(processor, [registry_path], [act_path])
+
+    assert_same_result(second, compare_in_memory(config, [registry_path], [act_path]))
+
+
+def test_session_reuses_unchanged_result(tmp_path, config):
+    registry, act = make_sides()
+    paths = (
+        [write_csv(registry, tmp_path / "registry.csv")],
+        [write_csv(act, tmp_path / "act.csv")],
+    )
+    processor = ExcelProcessor(config)
+    session = ComparisonSession()
+
+    first = session.compare(processor, *paths)
+    assert session.compare(processor, *paths) is first
+
+
+def test_session_follows_setting_changes(tmp_path, config):
+    registry, act = make_sides()
+    paths = (
+        [write_csv(registry, tmp_path / "registry.csv")],
+        [write_csv(act, tmp_path / "act.csv")],
+    )
+    session = ComparisonSession()
+    session.compare(ExcelProcessor(config), *paths)
+
+    config = dict(config, epsilon=10.0, duplicates="sum")
+    result = session.compare(ExcelProcessor(config), *paths)
+
+    assert_same_result(result, compare_in_memory(config, *paths))
+
+
+def test_partitioned_matches_in_memory_without_rows(tmp_path, config):
+    registry, act = make_sides()
+    registry_paths = [write_csv(registry.iloc[:0], tmp_path / "registry.csv")]
+    act_paths = [write_csv(act.iloc[:0], tmp_path / "act.csv")]
+
+    actual = PartitionedComparison(ExcelProcessor(config)).compare(
+        registry_paths, act_paths
+    )
+
+    expected = compare_in_memory(config, registry_paths, act_paths)
+    assert actual.empty
+    pd.testing.assert_frame_equal(actual, expected.reset_index(drop=True))
@@ -0,0 +1,1003 @@
+"""Main window of the Discrepancy Finder GUI.
+
+Imported by ``main`` once the first window is shown, since it pulls in pandas
+and the comparison modules.
+"""
+
+import logging
+import queue
+import re
+import sqlite3
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from PyQt5.QtCore import (
+    Qt,
+    QSize,
+    QModelIndex,
+    QThreadPool,
+    QTimer,
+    QAbstractTableModel,
+)
+from PyQt5.QtGui import QIcon, QColor
+from PyQt5.QtWidgets import (
+    QAbstractItemView,
+    QAction,
+    QDialog,
+    QDialogButtonBox,
+    QFileDialog,
+    QGraphicsDropShadowEffect,
+    QHeaderView,
+    QLabel,
+    QLineEdit,
+    QMainWindow,
+    QMessageBox,
+    QProgressDialog,
+    QStatusBar,
+    QTabWidget,
+    QTableView,
+    QTableWidget,
+    QTableWidgetItem,
+    QTextEdit,
+    QToolBar,
+    QVBoxLayout,
+    QWidget,
+)
+
+from logic import AMOUNT_COLUMNS, ExcelProcessor, format_amount
+from background import BatchCompareTask, CompareFilesTask, ExportTask
+from session import ComparisonSession
+from export import EXPORT_FORMATS
+from history import open_history
+from instrumentation import StageRecorder, metrics_path, write_metrics
+from resources import load_translation, log_path, resource_path
+
+# File dialog filter for registries and acts
+INPUT_FILTER = (
+    "Excel / CSV / Parquet Files "
+    "(*.xlsx *.xls *.csv *.tsv *.parquet *.feather *.arrow)"
+)
+
+
+class PandasModel(QAbstractTableModel):
+    """Qt model for displaying pandas DataFrame in QTableView.
+
+    Columns are kept as NumPy arrays and rows are shown through a permutation
+    index, so sorting and filtering never copy the data. Text columns are
+    converted to pyarrow strings once, on first sort or filter, and each
+    column's sort order is kept; a column that is already in order (IDs of a
+    comparison result) needs no sort. Rows are handed to the view in batches
+    through ``canFetchMore``/``fetchMore``.
+    """
+
+    FETCH_BATCH = 2000
+
+    def __init__(self, df=None, parent=None):
+        super().__init__(parent)
+        self._sort_column = None
+        self._descending = False
+        self._filter = ""
+        self._set_frame(pd.DataFrame() if df is None else df)
+        self._order = np.arange(self._rows)
+        self._loaded = min(self.FETCH_BATCH, self._rows)
+
+    @property
+    def headers(self):
+        """Column names shown in the header."""
+        return list(self._headers)
+
+    def _set_frame(self, df):
+        """Store the columns of a frame and drop what was derived from the last."""
+        self._headers = [str(c) for c in df.columns]
+        self._columns = [df[c].to_numpy() for c in df.columns]
+        self._amounts = [h in AMOUNT_COLUMNS for h in self._headers]
+        self._rows = len(df)
+        self._sort_index = {}  # column -> cached ascending argsort
+        self._text = {}  # column -> text of an object column
+        self._mask = None  # rows passing the ID filter
+        self._ids = None  # lower-cased ID strings, built on first filter
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self._order)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.FETCH_BATCH, len(self._order) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            # Amounts are stored as numbers and formatted only when shown
+            column = index.column()
+            value = self._columns[column][self._order[index.row()]]
+            if value is None or (isinstance(value, float) and value != value):
+                return ""
+            if isinstance(value, float) and self._amounts[column]:
+                return format_amount(value)
+            return str(value)
+        if role == Qt.TextAlignmentRole and index.column() > 0:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self._headers[section]
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Sort rows by a column by reordering the permutation index."""
+        if not 0 <= column < len(self._columns):
+            return
+        self.layoutAboutToBeChanged.emit()
+        self._sort_column = column
+        self._descending = order == Qt.DescendingOrder
+        self._update_order()
+        self.layoutChanged.emit()
+
+    def set_filter(self, text):
+        """Show only rows whose ID contains text (case-insensitive)."""
+        self._filter = text.strip().lower()
+        self._apply_mask()
+        self.beginResetModel()
+        self._update_order()
+        self._loaded = min(self.FETCH_BATCH, len(self._order))
+        self.endResetModel()
+
+    def replace(self, df):
+        """Show a new version of the rows, keeping sort, filter and scroll.
+
+        The model is updated as a layout change rather than a reset, so the
+        view keeps its position. ``df`` must have the same columns.
+        """
+        self.layoutAboutToBeChanged.emit()
+        loaded = self._loaded
+        self._set_frame(df)
+        self._apply_mask()
+        self._update_order()
+        self._loaded = min(max(loaded, self.FETCH_BATCH), len(self._order))
+        gone = [i for i in self.persistentIndexList() if i.row() >= self._loaded]
+        self.changePersistentIndexList(gone, [QModelIndex()] * len(gone))
+        self.layoutChanged.emit()
+
+    def _apply_mask(self):
+        """Rebuild the filter mask for the current filter text."""
+        if not self._filter:
+            self._mask = None
+            return
+        text = self._column_text(0)
+        if text is not None:
+            import pyarrow.compute as pc
+
+            if self._ids is None:
+                self._ids = pc.utf8_lower(text)
+            found = pc.match_substring(self._ids, self._filter)
+            self._mask = found.to_numpy(zero_copy_only=False)
+        else:
+            if self._ids is None:
+                self._ids = self._lowercase_ids()
+            self._mask = np.char.find(self._ids, self._filter) >= 0
+
+    def _column_text(self, column):
+        """Return a column as a pyarrow string array, or None without pyarrow.
+
+        Built once per column; values that are not strings are converted with
+        ``str`` as the numpy fallback does.
+        """
+        if column in self._text:
+            return self._text[column]
+        try:
+            import pyarrow as pa
+        except ImportError:
+            self._text[column] = None
+            return None
+        values = self._columns[column]
+        try:
+            text = pa.array(values, type=pa.string())
+            if text.null_count:
+                raise pa.ArrowInvalid("missing values")
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            text = pa.array([str(v) for v in values], type=pa.string())
+        self._text[column] = text
+        return text
+
+    def _argsort(self, column):
+        """Return the ascending, stable order of a column's rows."""
+        values = self._columns[column]
+        if values.dtype == object:
+            text = self._column_text(column)
+            if text is None:
+                return np.argsort(values.astype(str), kind="stable")
+            import pyarrow.compute as pc
+
+            if len(text) < 2 or pc.all(pc.greater_equal(text[1:], text[:-1])).as_py():
+                return np.arange(len(text))
+            return pc.sort_indices(text).to_numpy()
+        if values.dtype.kind not in "fiub":
+            return np.argsort(values, kind="stable")
+        ordered = values[1:] >= values[:-1]
+        if values.dtype.kind == "f":
+            # NaN sorts last, so a trailing run of NaN keeps the order
+            ordered |= np.isnan(values[1:])
+        if ordered.all():
+            return np.arange(len(values))
+        # Quicksort is several times faster than a stable sort; equal values
+        # are then put back in row order, as a stable sort leaves them
+        order = np.argsort(values)
+        ranked = values[order]
+        same = ranked[1:] == ranked[:-1]
+        if values.dtype.kind == "f":
+            same |= np.isnan(ranked[1:]) & np.isnan(ranked[:-1])
+        if same.any():
+            group = np.concatenate(([0], np.cumsum(~same)))
+            order = order[np.argsort(group * len(values) + order)]
+        return order
+
+    def _lowercase_ids(self):
+        """Build the lower-cased ID array searched by the filter."""
+        ids = [str(v) for v in self._columns[0]]
+        # One str.lower() over the joined IDs is much faster than per element
+        lowered = "\n".join(ids).lower().split("\n")
+        if len(lowered) != len(ids):  # an ID contains a line break
+            lowered = [v.lower() for v in ids]
+        return np.array(lowered, dtype=str)
+
+    def visible_rows(self):
+        """Return the number of rows passing the current filter."""
+        return len(self._order)
+
+    def _update_order(self):
+        """Rebuild the permutation index from the current sort and filter."""
+        if self._sort_column is None:
+            order = np.arange(self._rows)
+        else:
+            order = self._sort_index.get(self._sort_column)
+            if order is None:
+                order = self._argsort(self._sort_column)
+                self._sort_index[self._sort_column] = order
+            if self._descending:
+                order = order[::-1]
+        if self._mask is not None:
+            order = order[self._mask[order]]
+        self._order = order
+
+
+class LogHandler(logging.Handler):
+    """Logging handler showing records in a QTextEdit, safe from any thread.
+
+    ``emit`` only queues the formatted line, so worker threads never touch
+    the widget. A timer in the GUI thread appends the queued lines in one
+    batch every ``flush_ms`` milliseconds, and the widget keeps at most
+    ``max_lines`` lines.
+    """
+
+    def __init__(self, log_widget, max_lines, flush_ms):
+        super().__init__()
+        self.log_widget = log_widget
+        self.max_lines = max_lines
+        self.log_widget.document().setMaximumBlockCount(max_lines)
+        self._lines = queue.SimpleQueue()
+        self._timer = QTimer(log_widget)
+        self._timer.timeout.connect(self.show_queued)
+        self._timer.start(flush_ms)
+
+    def emit(self, record):
+        try:
+            self._lines.put(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+    def show_queued(self):
+        """Append the lines queued since the last call (GUI thread only)."""
+        lines = []
+        while True:
+            try:
+                lines.append(self._lines.get_nowait())
+            except queue.Empty:
+                break
+        if lines:
+            # Older lines would be dropped by the widget right away
+            self.log_widget.append("\n".join(lines[-self.max_lines :]))
+
+
+class MainWindow(QMainWindow):
+    """Main application window."""
+
+    def __init__(self, lang_code, config):
+        super().__init__()
+        self.tr = load_translation(lang_code)
+        self.config = config
+        self.processor = ExcelProcessor(config)
+        self.log_path = log_path(config)
+
+        self.setWindowTitle(self.tr["window_title"])
+        self.setWindowIcon(
+            QIcon(resource_path("assets/icons/icons8-yandex-international-240.ico"))
+        )
+        self.resize(self.config["window"]["width"], self.config["window"]["height"])
+
+        self.registry_paths = []
+        self.act_paths = []
+        self.diffs = pd.DataFrame()
+        self.stage_records = []
+        self.session = ComparisonSession()  # Makes re-comparisons incremental
+        self.thread_pool = QThreadPool()
+
+        self._build_ui()
+        self._setup_logging()
+
+    def _build_ui(self):
+        """Build the user interface."""
+        # Reminder banner
+        self.reminder = QLabel(self.tr["reminder"], self)
+        self.reminder.setTextFormat(Qt.RichText)
+        self.reminder.setStyleSheet(
+            "padding:8px; background:#fff3cd; border:1px solid #ffeeba; border-radius:6px;"
+        )
+
+        # Tab widget
+        self.table = QTableView()
+        # Keep the engine's row order until a column header is clicked
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        self.table.setModel(PandasModel())
+        self.log = QTextEdit()
+        self.log.setReadOnly(True)
+
+        # Stage timings of the last comparison, shown above the log
+        self.timing = QTableWidget(0, 6)
+        self.timing.setHorizontalHeaderLabels(
+            [
+                self.tr["timing_stage"],
+                self.tr["timing_file"],
+                self.tr["timing_rows"],
+                self.tr["timing_seconds"],
+                self.tr["timing_rss"],
+                self.tr["timing_alloc"],
+            ]
+        )
+        self.timing.verticalHeader().setVisible(False)
+        self.timing.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.timing.horizontalHeader().setSectionResizeMode(
+            QHeaderView.ResizeToContents
+        )
+        self.timing.setMaximumHeight(160)
+
+        # ID filter above the results, applied after a short typing pause
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText(self.tr["filter_placeholder"])
+        self.filter_edit.setClearButtonEnabled(True)
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(200)
+        self.filter_timer.timeout.connect(self._apply_filter)
+        self.filter_edit.textChanged.connect(self.filter_timer.start)
+
+        results = QWidget()
+        results_box = QVBoxLayout(results)
+        results_box.setContentsMargins(0, 0, 0, 0)
+        results_box.addWidget(self.filter_edit)
+        results_box.addWidget(self.table)
+
+        logs = QWidget()
+        logs_box = QVBoxLayout(logs)
+        logs_box.setContentsMargins(0, 0, 0, 0)
+        logs_box.addWidget(self.timing)
+        logs_box.addWidget(self.log)
+
+        # Batch results (one tab per act) are added after the first batch run
+        self.batch_tabs = QTabWidget()
+        self.batch_frames = []  # (report name, frame) per batch tab
+
+        # Near-matched IDs (after a comparison with fuzzy.enabled) and the
+        # changes between two saved runs get tabs of their own when shown
+        self.near_table = sortable_table()
+        self.changes_table = sortable_table()
+        self.tab_frames = {}  # view -> (report name, frame) of these tabs
+
+        tabs = QTabWidget()
+        tabs.addTab(results, self.tr["tab_results"])
+        tabs.addTab(logs, self.tr["tab_logs"])
+        self.tabs = tabs
+
+        # Layout
+        central = QWidget()
+        vbox = QVBoxLayout(central)
+        vbox.setContentsMargins(12, 12, 12, 12)
+        vbox.setSpacing(10)
+        vbox.addWidget(self.reminder)
+        vbox.addWidget(tabs)
+        self.setCentralWidget(central)
+
+        # Create UI elements
+        self._create_actions()
+        self._create_menu()
+        self._create_toolbar()
+        self._create_statusbar()
+        # Shadow effect
+        shadow = QGraphicsDropShadowEffect(self.centralWidget())
+        shadow.setBlurRadius(self.config["colors"]["shadow"]["blur"])
+        shadow.setOffset(self.config["colors"]["shadow"]["offset"])
+        shadow.setColor(rgba_to_qcolor(self.config["colors"]["shadow"]["color"]))
+        self.centralWidget().setGraphicsEffect(shadow)
+
+    def _create_actions(self):
+        """Create application actions."""
+        ic = QIcon.fromTheme
+        self.a_open_reg = QAction(ic("document-open"), self.tr["open_registry"], self)
+        self.a_open_reg.triggered.connect(lambda: self._load("reg"))
+
+        self.a_open_act = QAction(ic("document-open"), self.tr["open_act"], self)
+        self.a_open_act.triggered.connect(lambda: self._load("act"))
+
+        self.a_compare = QAction(ic("view-refresh"), self.tr["compare"], self)
+        self.a_compare.setEnabled(False)
+        self.a_compare.triggered.connect(self._compare)
+
+        self.a_batch = QAction(ic("view-refresh"), self.tr["compare_batch"], self)
+        self.a_batch.setEnabled(False)
+        self.a_batch.triggered.connect(self._compare_batch)
+
+        # Profile only the next comparison; unchecked again when it starts
+        self.a_profile = QAction(self.tr["profile_next"], self)
+        self.a_profile.setCheckable(True)
+
+        self.a_save = QAction(ic("document-save"), self.tr["save"], self)
+        self.a_save.setEnabled(False)
+        self.a_save.triggered.connect(self._save)
+
+        self.a_history = QAction(ic("document-open-recent"), self.tr["history"], self)
+        self.a_history.triggered.connect(self._show_history)
+
+        self.a_clear = QAction(ic("edit-clear"), self.tr["clear"], self)
+        self.a_clear.triggered.connect(self._clear)
+
+        self.a_exit = QAction(self.tr["exit"], self)
+        self.a_exit.triggered.connect(self.close)
+
+    def _create_menu(self):
+        """Create application menu."""
+        menu = self.menuBar().addMenu(self.tr["menu_file"])
+        actions = [
+            self.a_open_reg,
+            self.a_open_act,
+            None,
+            self.a_compare,
+            self.a_batch,
+            self.a_profile,
+            self.a_save,
+            self.a_history,
+            None,
+            self.a_clear,
+            None,
+            self.a_exit,
+        ]
+        for action in actions:
+            if action:
+                menu.addAction(action)
+            else:
+                menu.addSeparator()
+
+    def _create_toolbar(self):
+        """Create application toolbar."""
+        toolbar = QToolBar()
+        toolbar.setIconSize(QSize(24, 24))
+        self.addToolBar(toolbar)
+
+        actions = [
+            self.a_open_reg,
+            self.a_open_act,
+            None,
+            self.a_compare,
+            self.a_save,
+            None,
+            self.a_clear,
+            self.a_exit,
+        ]
+        for action in actions:
+            if action:
+                toolbar.addAction(action)
+            else:
+                toolbar.addSeparator()
+
+    def _create_statusbar(self):
+        """Create application status bar."""
+        statusbar = QStatusBar()
+        self.setStatusBar(statusbar)
+
+        self.l_reg = QLabel(self.tr["registry_label"])
+        self.l_act = QLabel(self.tr["act_label"])
+        self.l_sum_reg = QLabel(self.tr["sum_registry"])
+        self.l_sum_act = QLabel(self.tr["sum_act"])
+
+        for label in (self.l_reg, self.l_act, self.l_sum_reg, self.l_sum_act):
+            statusbar.addPermanentWidget(label)
+            label.setStyleSheet(
+                "padding:4px; border:1px solid #888; background:#eef; border-radius:4px;"
+            )
+
+    def _load(self, mode):
+        """Load one or more Excel files for registry or act.
+
+        Several selected files (and the sheets matching ``excel.sheets``) are
+        combined into one registry or act.
+        """
+        title = self.tr["open_registry"] if mode == "reg" else self.tr["open_act"]
+        paths, _ = QFileDialog.getOpenFileNames(self, title, "", INPUT_FILTER)
+        if not paths:
+            return
+        path = paths[0]  # Named in error messages
+        names = ", ".join(Path(p).name for p in paths)
+
+        try:
+            df_clean, _, amt_col = self.processor.load_sides([paths])[0]
+            total = df_clean[amt_col].sum()
+
+            if mode == "reg":
+                self.registry_paths = paths
+                self.l_reg.setText(f"{self.tr['open_registry']}: {names}")
+                self.l_sum_reg.setText(
+                    f"{self.tr['sum_registry'].split(':')[0]}: {total:,.2f}"
+                )
+            else:
+                self.act_paths = paths
+                self.l_act.setText(f"{self.tr['open_act']}: {names}")
+                self.l_sum_act.setText(
+                    f"{self.tr['sum_act'].split(':')[0]}: {total:,.2f}"
+                )
+
+            self._update_buttons()
+            logging.info("Loaded %s: %s", mode, "; ".join(paths))
+
+        except FileNotFoundError as e:
+            logging.exception("Failed to find file: %s", path)
+            QMessageBox.critical(
+                self, "Error", self.tr["err_load"].format(Path(path).name, str(e))
+            )
+        except pd.errors.EmptyDataError:
+            logging.exception("Empty file: %s", path)
+            QMessageBox.critical(
+                self,
+                "Error",
+                self.tr["err_load"].format(Path(path).name, "File is empty"),
+            )
+        except (pd.errors.ParserError, ValueError) as e:
+            logging.exception("Failed to parse file: %s", path)
+            QMessageBox.critical(
+                self, "Error", self.tr["err_load"].format(Path(path).name, str(e))
+            )
+
+    def _apply_filter(self):
+        """Filter the results table by the text in the filter box."""
+        model = self.table.model()
+        model.set_filter(self.filter_edit.text())
+        self.statusBar().showMessage(
+            self.tr["filter_rows"].format(model.visible_rows()), 3000
+        )
+
+    def _set_results(self, df=None):
+        """Show a results frame, keeping the current filter and sort column."""
+        model = PandasModel(df)
+        self.table.setModel(model)
+        header = self.table.horizontalHeader()
+        if self.filter_edit.text():
+            model.set_filter(self.filter_edit.text())
+        if 0 <= header.sortIndicatorSection() < model.columnCount():
+            model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
+
+    def _update_buttons(self):
+        """Update button states based on loaded files."""
+        self.a_compare.setEnabled(bool(self.registry_paths and self.act_paths))
+        self.a_batch.setEnabled(bool(self.registry_paths))
+
+    def _compare(self):
+        """Compare Excel files in background thread."""
+        if not (self.registry_paths and self.act_paths):
+            QMessageBox.warning(self, "Warning", self.tr["warn_load"])
+            return
+
+        profile_path = None
+        if self.a_profile.isChecked():
+            self.a_profile.setChecked(False)
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+            profile_path = self.log_path.with_name(
+                f"{self.log_path.stem}.profile-{stamp}"
+            )
+
+        # Create and start background task with a cancellable progress dialog
+        self.stage_records = []
+        task = CompareFilesTask(
+            self.registry_paths,
+            self.act_paths,
+            profile_path,
+            self.session,
+            self.config,
+        )
+        task.signals.metrics.connect(self._handle_metrics)
+        self.dlg = self._progress_dialog(
+            self.tr["dlg_compare"], self.tr["dlg_compare"], task
+        )
+        task.signals.near_matches.connect(self._handle_near_matches)
+        task.signals.finished.connect(self._handle_comparison_result)
+        task.signals.error.connect(self._handle_comparison_error)
+        task.signals.cancelled.connect(self._handle_comparison_cancelled)
+        self.thread_pool.start(task)
+
+    def _compare_batch(self):
+        """Compare the loaded registry with several acts in a background thread."""
+        paths, _ = QFileDialog.getOpenFileNames(
+            self,
+            self.tr["compare_batch"],
+            "",
+            INPUT_FILTER,
+        )
+        if not paths:
+            return
+
+        self.stage_records = []
+        task = BatchCompareTask(self.registry_paths, paths, config=self.config)
+        task.signals.metrics.connect(self._handle_metrics)
+        self.dlg = self._progress_dialog(
+            self.tr["dlg_compare"], self.tr["dlg_batch"], task
+        )
+        task.signals.finished.connect(self._handle_batch_result)
+        task.signals.error.connect(self._handle_comparison_error)
+        task.signals.cancelled.connect(self._handle_comparison_cancelled)
+        self.thread_pool.start(task)
+
+    def _progress_dialog(self, title: str, label: str, task) -> QProgressDialog:
+        """Show a modal progress dialog whose Cancel button stops the task."""
+        dlg = QProgressDialog(label, self.tr["cancel"], 0, 100, self)
+        dlg.setWindowTitle(title)
+        dlg.setWindowModality(Qt.WindowModal)
+        dlg.setMinimumWidth(300)
+        dlg.setValue(0)
+        dlg.canceled.connect(task.cancel)
+        # Progress arriving before the task reaches a checkpoint must not
+        # bring a cancelled dialog back
+        task.signals.progress.connect(
+            lambda value: dlg.wasCanceled() or dlg.setValue(value)
+        )
+        dlg.show()
+        return dlg
+
+    def _handle_metrics(self, records):
+        """Keep the stage records of the running comparison."""
+        self.stage_records = list(records)
+
+    def _handle_comparison_result(self, diffs):
+        """Handle successful comparison results."""
+        self.dlg.close()
+
+        display = StageRecorder()
+        with display.stage("display", rows=len(diffs)):
+            model = self.table.model()
+            if diffs.empty:
+                self._set_results()
+            elif isinstance(model, PandasModel) and model.headers == list(
+                diffs.columns
+            ):
+                # A re-comparison: update the shown rows, keeping the view state
+                self.diffs = diffs
+                model.replace(diffs)
+            else:
+                self.diffs = diffs
+                self._set_results(self.diffs)
+                self.table.horizontalHeader().setSectionResizeMode(
+                    0, QHeaderView.Stretch
+                )
+        if self.stage_records:
+            self._show_metrics(self.stage_records + display.records)
+
+        if diffs.empty:
+            self.a_save.setEnabled(False)
+            QMessageBox.information(self, "Info", self.tr["no_diff"])
+            return
+
+        self.a_save.setEnabled(True)
+
+        QMessageBox.information(self, "Info", self.tr["diff_found"].format(len(diffs)))
+        logging.info("Found %s discrepancies", len(diffs))
+
+    def _handle_near_matches(self, matches):
+        """Show the near-matched IDs in their own tab, after the results."""
+        title = self.tr["tab_near_matches"].format(len(matches))
+        self._show_tab_frame(self.near_table, "near_matches", matches, title)
+        logging.info("Found %s near-matched IDs", len(matches))
+
+    def _show_tab_frame(self, view, name, frame, title):
+        """Show a frame in one of the extra tabs, inserted after the results."""
+        self.tab_frames[view] = (name, frame)
+        view.setModel(PandasModel(frame))
+        view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        index = self.tabs.indexOf(view)
+        if index < 0:
+            self.tabs.insertTab(1, view, title)
+        else:
+            self.tabs.setTabText(index, title)
+
+    def _show_history(self):
+        """Open a saved run, or show what changed between two saved runs."""
+        history = open_history(self.config)
+        if history is None:
+            QMessageBox.information(self, "Info", self.tr["history_disabled"])
+            return
+        try:
+            dialog = HistoryDialog(history.runs(), self.tr, self)
+            if dialog.exec_() != QDialog.Accepted:
+                return
+            runs = dialog.selected_runs()
+            if dialog.action == "open":
+                self._show_past_run(runs[0], history.load_run(runs[0]))
+                return
+            old, new = min(runs), max(runs)
+            changes = history.diff_runs(old, new)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            logging.exception("Failed to read the run history %s", history.path)
+            QMessageBox.critical(self, "Error", str(e))
+            return
+        title = self.tr["tab_changes"].format(old, new)
+        self._show_tab_frame(self.changes_table, f"changes_{old}_{new}", changes, title)
+        self.tabs.setCurrentWidget(self.changes_table)
+        self.a_save.setEnabled(True)
+        logging.info("Runs %s and %s differ in %s IDs", old, new, len(changes))
+
+    def _show_past_run(self, run_id, diffs):
+        """Show the discrepancies of a saved run in the results tab."""
+        self.diffs = diffs
+        self._set_results(diffs)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.tabs.setCurrentIndex(0)
+        self.a_save.setEnabled(not diffs.empty)
+        self.statusBar().showMessage(
+            self.tr["history_loaded"].format(run_id, len(diffs)), 5000
+        )
+        logging.info("Opened run %s with %s discrepancies", run_id, len(diffs))
+
+    def _handle_batch_result(self, result):
+        """Show a summary tab, one tab per act and the uncovered registry rows."""
+        self.dlg.close()
+
+        display = StageRecorder()
+        with display.stage("display", rows=sum(len(f) for f in result.acts.values())):
+            self.batch_tabs.clear()
+            # (tab title, default report name, frame)
+            tabs = [(self.tr["batch_summary"], "summary", result.summary)]
+            tabs += [
+                (f"{name} ({len(frame)})", Path(name).stem, frame)
+                for name, frame in result.acts.items()
+            ]
+            tabs.append(
+                (
+                    self.tr["batch_uncovered"].format(len(result.uncovered)),
+                    "not_in_any_act",
+                    result.uncovered,
+                )
+            )
+            self.batch_frames = [(name, frame) for _, name, frame in tabs]
+            for title, _, frame in tabs:
+                view = QTableView()
+                view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+                view.setSortingEnabled(True)
+                view.setModel(PandasModel(frame))
+                view.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+                self.batch_tabs.addTab(view, title)
+            if self.tabs.indexOf(self.batch_tabs) < 0:
+                self.tabs.insertTab(1, self.batch_tabs, self.tr["tab_batch"])
+            self.tabs.setCurrentWidget(self.batch_tabs)
+        if self.stage_records:
+            self._show_metrics(self.stage_records + display.records)
+
+        self.a_save.setEnabled(True)
+        total = sum(len(frame) for frame in result.acts.values())
+        QMessageBox.information(
+            self,
+            "Info",
+            self.tr["batch_done"].format(
+                len(result.acts), total, len(result.uncovered)
+            ),
+        )
+
+    def _show_metrics(self, records):
+        """Fill the timing panel and append the records to the metrics file."""
+        self.timing.setRowCount(len(records))
+        for row, record in enumerate(records):
+            values = [
+                self.tr.get(f"stage_{record['stage']}", record["stage"]),
+                record.get("file", ""),
+                f"{record['rows']:,}",
+                f"{record['seconds']:.3f}",
+                f"{record['peak_rss_mb']:.1f}",
+                f"{record['alloc_peak_mb']:.1f}" if "alloc_peak_mb" in record else "",
+            ]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col >= 2:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.timing.setItem(row, col, item)
+
+        write_metrics(metrics_path(self.log_path), uuid.uuid4().hex, records)
+        logging.info(
+            "Stage timings: %s",
+            ", ".join(f"{r['stage']} {r['seconds']:.2f}s" for r in records),
+        )
+
+    def _handle_comparison_error(self, error_msg):
+        """Handle comparison task errors."""
+        self.dlg.close()
+        QMessageBox.critical(self, "Error", str(error_msg))
+
+    def _handle_comparison_cancelled(self):
+        """Handle a cancelled comparison."""
+        self.dlg.close()
+        self.statusBar().showMessage(self.tr["compare_cancelled"], 3000)
+
+    def _clear(self):
+        """Clear all loaded data."""
+        self.registry_paths = []
+        self.act_paths = []
+        self.diffs = pd.DataFrame()
+        self.session.reset()
+        self.batch_tabs.clear()
+        self.batch_frames = []
+        if self.tabs.indexOf(self.batch_tabs) >= 0:
+            self.tabs.removeTab(self.tabs.indexOf(self.batch_tabs))
+        for view in self.tab_frames:
+            if self.tabs.indexOf(view) >= 0:
+                self.tabs.removeTab(self.tabs.indexOf(view))
+        self.tab_frames = {}
+
+        self._set_results()
+        self.filter_edit.clear()
+        self.log.clear()
+
+        self.l_reg.setText(self.tr["registry_label"])
+        self.l_act.setText(self.tr["act_label"])
+        self.l_sum_reg.setText(self.tr["sum_registry"])
+        self.l_sum_act.setText(self.tr["sum_act"])
+
+        self.a_compare.setEnabled(False)
+        self.a_batch.setEnabled(False)
+        self.a_save.setEnabled(False)
+
+        logging.info("Cleared data")
+
+    def _save(self):
+        """Save comparison results to file in a background thread.
+
+        While the batch tab is shown, the table of its current tab is saved;
+        the near-matches and run changes tabs save their own tables.
+        """
+        diffs, name = self.diffs, "discrepancies"
+        if self.tabs.currentWidget() is self.batch_tabs and self.batch_frames:
+            name, diffs = self.batch_frames[self.batch_tabs.currentIndex()]
+        elif self.tabs.currentWidget() in self.tab_frames:
+            name, diffs = self.tab_frames[self.tabs.currentWidget()]
+        if diffs.empty:
+            return
+
+        default = Path.home() / "Downloads" / f"{name}.txt"
+        fn, selected = QFileDialog.getSaveFileName(
+            self, self.tr["save_dialog"], str(default), self.tr["save_filters"]
+        )
+        if not fn:
+            return
+        path = Path(fn)
+        if path.suffix.lower() not in EXPORT_FORMATS:
+            # Some platform dialogs do not append the selected filter's extension
+            match = re.search(r"\*(\.\w+)", selected)
+            path = path.with_name(path.name + (match.group(1) if match else ".txt"))
+
+        task = ExportTask(diffs, path)
+        self.save_dlg = self._progress_dialog(
+            self.tr["save_dialog"], self.tr["dlg_export"], task
+        )
+        task.signals.finished.connect(self._handle_export_result)
+        task.signals.error.connect(self._handle_export_error)
+        task.signals.cancelled.connect(self._handle_export_cancelled)
+        self.thread_pool.start(task)
+
+    def _handle_export_result(self, fn):
+        """Handle a successfully written report."""
+        self.save_dlg.close()
+        QMessageBox.information(
+            self, self.tr["save_dialog"], self.tr["msg_saved"].format(fn)
+        )
+        logging.info("Saved to %s", fn)
+
+    def _handle_export_error(self, error_msg):
+        """Handle report export errors."""
+        self.save_dlg.close()
+        QMessageBox.critical(self, "Error", error_msg)
+
+    def _handle_export_cancelled(self):
+        """Handle a cancelled report export."""
+        self.save_dlg.close()
+        self.statusBar().showMessage(self.tr["export_cancelled"], 3000)
+
+    def _setup_logging(self):
+        """Show log records in the Logs tab (the file is set up by ``main``)."""
+        settings = self.config["log_view"]
+        handler = LogHandler(self.log, settings["max_lines"], settings["flush_ms"])
+        handler.setFormatter(
+            logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+        )
+        logging.getLogger().addHandler(handler)
+        logging.getLogger().setLevel(logging.INFO)
+
+
+class HistoryDialog(QDialog):
+    """Lists saved runs; one selected run can be opened, two compared."""
+
+    def __init__(self, runs, tr, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(tr["history_title"])
+        self.resize(720, 420)
+        self.runs = runs
+        self.action = None
+
+        self.view = QTableView()
+        self.view.setModel(PandasModel(runs))
+        self.view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.view.selectionModel().selectionChanged.connect(self._update_buttons)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        self.b_open = buttons.addButton(tr["history_open"], QDialogButtonBox.ActionRole)
+        self.b_open.clicked.connect(lambda: self._finish("open"))
+        self.b_diff = buttons.addButton(tr["history_diff"], QDialogButtonBox.ActionRole)
+        self.b_diff.clicked.connect(lambda: self._finish("diff"))
+        buttons.rejected.connect(self.reject)
+        self._update_buttons()
+
+        box = QVBoxLayout(self)
+        box.addWidget(self.view)
+        box.addWidget(buttons)
+
+    def selected_runs(self):
+        """Return the numbers of the selected runs."""
+        rows = sorted(
+            {index.row() for index in self.view.selectionModel().selectedRows()}
+        )
+        return [int(self.runs["Run"].iloc[row]) for row in rows]
+
+    def _update_buttons(self):
+        count = len(self.view.selectionModel().selectedRows())
+        self.b_open.setEnabled(count == 1)
+        self.b_diff.setEnabled(count == 2)
+
+    def _finish(self, action):
+        self.action = action
+        self.accept()
+
+
+def sortable_table():
+    """Return a table view sorted by clicking a column header."""
+    view = QTableView()
+    # Keep the model's row order until a column header is clicked
+    view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+    view.setSortingEnabled(True)
+    return view
+
+
+def rgba_to_qcolor(rgba):
+    """Convert RGBA values to QColor."""
+    if len(rgba) != 4:
+        raise ValueError("RGBA color must have 4 components")
+    return QColor(rgba[0], rgba[1], rgba[2], rgba[3])